@@ -9,7 +9,7 @@ from sqlalchemy import text
 from app.config import *
 from app.db import AsyncSessionLocal, redis_client
 from app.utils import state_key, login_session_key, safe_redirect
-from app.google_auth import exchange_token, fetch_userinfo
+from app.google_auth import exchange_token, fetch_userinfo, invalidate_youtube_credentials
 from app.security import create_jwt
 
 router = APIRouter(tags=["auth"])
@@ -21,7 +21,7 @@ router = APIRouter(tags=["auth"])
 @router.get("/google/login")
 async def google_login():
     state = secrets.token_urlsafe(16)
-    redis_client.setex(state_key(state), STATE_TTL_SECONDS, "1")
+    await redis_client.setex(state_key(state), STATE_TTL_SECONDS, "1")
 
     scopes = [
         "openid",
@@ -69,11 +69,11 @@ async def google_callback(
 
     # state 검증
     sk = state_key(state)
-    if not redis_client.exists(sk):
+    if not await redis_client.exists(sk):
         return RedirectResponse(
             safe_redirect(FRONTEND_ERROR_URL, {"reason": "invalid_state"})
         )
-    redis_client.delete(sk)
+    await redis_client.delete(sk)
 
     # ---- Google Token Exchange ----
     try:
@@ -157,11 +157,14 @@ async def google_callback(
 
         await db.commit()
 
+    # 새 토큰으로 다시 읽도록 YouTube credentials 캐시 비움
+    invalidate_youtube_credentials(user_id)
+
     # ---- JWT 발급 ----
     jwt_token = create_jwt(user_id=user_id, email=email)
 
     sid = secrets.token_urlsafe(16)
-    redis_client.setex(login_session_key(sid), LOGIN_SESSION_TTL_SECONDS, jwt_token)
+    await redis_client.setex(login_session_key(sid), LOGIN_SESSION_TTL_SECONDS, jwt_token)
 
     return RedirectResponse(
         safe_redirect(FRONTEND_SUCCESS_URL, {"sid": sid})
@@ -173,12 +176,12 @@ async def google_callback(
 # ======================================================
 @router.get("/session")
 async def get_login_session(sid: str):
-    token = redis_client.get(login_session_key(sid))
+    token = await redis_client.get(login_session_key(sid))
     if not token:
         raise HTTPException(status_code=401, detail="Session expired")
 
     # 1회용이므로 사용 후 삭제
-    redis_client.delete(login_session_key(sid))
+    await redis_client.delete(login_session_key(sid))
 
     return {
         "access_token": token,
@@ -71,3 +71,93 @@ AI_DB_URL = (
     f"postgresql+asyncpg://{AI_DB_USER}:{AI_DB_PASSWORD}"
     f"@{AI_DB_HOST}:{AI_DB_PORT}/{AI_DB_NAME}"
 )
+
+# =========================
+# DB 커넥션 풀 (모든 엔진 공통, pod당 최대 연결 = 엔진 수 x (POOL_SIZE + MAX_OVERFLOW))
+# =========================
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# =========================
+# KIE 결과 다운로드
+# =========================
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+DOWNLOAD_TIMEOUT_SECONDS = int(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "300"))
+
+# =========================
+# 콜백 후처리 파이프라인 (ingest)
+# =========================
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "100"))
+
+# =========================
+# 영상 스트리밍 (Range 응답)
+# =========================
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(256 * 1024)))
+
+# =========================
+# 영상/썸네일 전달 방식
+# - proxy   : WAS가 S3 바이트를 직접 중계 (기존 방식)
+# - redirect: 302로 S3 presigned URL 리다이렉트
+# - json    : {"url": presigned URL} 반환
+# =========================
+VIDEO_DELIVERY_MODE = os.getenv("VIDEO_DELIVERY_MODE", "proxy")
+PRESIGN_EXPIRES_SECONDS = int(os.getenv("PRESIGN_EXPIRES_SECONDS", "900"))
+# 만료 직전 URL을 내주지 않도록 캐시 TTL은 이만큼 짧게
+PRESIGN_CACHE_MARGIN_SECONDS = int(os.getenv("PRESIGN_CACHE_MARGIN_SECONDS", "60"))
+
+# =========================
+# 이벤트 루프 정지(stall) 감시
+# =========================
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_STALL_THRESHOLD_MS = int(os.getenv("LOOP_STALL_THRESHOLD_MS", "200"))
+
+# =========================
+# 유저별 영상 목록 인덱스 (Redis sorted set)
+# =========================
+VIDEO_LIST_DEFAULT_LIMIT = int(os.getenv("VIDEO_LIST_DEFAULT_LIMIT", "50"))
+VIDEO_LIST_MAX_LIMIT = int(os.getenv("VIDEO_LIST_MAX_LIMIT", "200"))
+
+# =========================
+# 작업 상태 (Redis hash task:{task_id})
+# =========================
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", "86400"))
+STATUS_BATCH_MAX = int(os.getenv("STATUS_BATCH_MAX", "100"))
+
+# =========================
+# 작업 상태 push (SSE)
+# =========================
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_DURATION_SECONDS = int(os.getenv("SSE_MAX_DURATION_SECONDS", "900"))
+
+# =========================
+# HLS 재생목록 (미디어 재생목록 서명 URL / 세그먼트 presigned URL 만료)
+# =========================
+HLS_URL_EXPIRES_SECONDS = int(os.getenv("HLS_URL_EXPIRES_SECONDS", "3600"))
+
+# =========================
+# YouTube 업로드 (S3 → YouTube resumable 업로드)
+# =========================
+# 청크 크기는 256KB의 배수여야 함 (YouTube resumable 업로드 제약)
+YOUTUBE_UPLOAD_CHUNK_SIZE = max(1, int(os.getenv("YOUTUBE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024))) // (256 * 1024)) * 256 * 1024
+YOUTUBE_UPLOAD_MAX_RETRIES = int(os.getenv("YOUTUBE_UPLOAD_MAX_RETRIES", "5"))
+
+# =========================
+# YouTube 업로드 작업 (백그라운드 실행 / 동시성 제한)
+# =========================
+YOUTUBE_UPLOAD_CONCURRENCY = int(os.getenv("YOUTUBE_UPLOAD_CONCURRENCY", "4"))
+YOUTUBE_UPLOAD_PER_USER = int(os.getenv("YOUTUBE_UPLOAD_PER_USER", "1"))
+# 유저당 대기+진행 중 작업 상한 (넘으면 429)
+YOUTUBE_UPLOAD_MAX_PENDING_PER_USER = int(os.getenv("YOUTUBE_UPLOAD_MAX_PENDING_PER_USER", "5"))
+YOUTUBE_JOB_TTL_SECONDS = int(os.getenv("YOUTUBE_JOB_TTL_SECONDS", "86400"))
+# QUEUED/UPLOADING 상태가 이 시간 동안 갱신되지 않으면 FAILED로 응답 (프로세스가 죽어 남은 작업)
+YOUTUBE_JOB_STALE_SECONDS = int(os.getenv("YOUTUBE_JOB_STALE_SECONDS", "900"))
+
+# =========================
+# YouTube credentials 캐시 (유저별 LRU / TTL)
+# =========================
+YOUTUBE_CREDENTIALS_CACHE_SIZE = int(os.getenv("YOUTUBE_CREDENTIALS_CACHE_SIZE", "512"))
+YOUTUBE_CREDENTIALS_CACHE_TTL_SECONDS = int(os.getenv("YOUTUBE_CREDENTIALS_CACHE_TTL_SECONDS", "3600"))
@@ -1,9 +1,18 @@
 # db.py
-import redis
+import redis.asyncio as redis
 import ssl
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.config import DB_URL, REDIS_HOST, REDIS_PORT, REDIS_DB
+from app.config import (
+    DB_URL,
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_DB,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_TIMEOUT,
+)
 
 # =========================
 # RDS SSL Context 생성
@@ -15,7 +24,10 @@ engine = create_async_engine(
     DB_URL,
     echo=False,
     pool_pre_ping=True,
-    pool_recycle=1800,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
     connect_args={"ssl": ssl_context}
 )
 
@@ -25,6 +37,7 @@ AsyncSessionLocal = sessionmaker(
     class_=AsyncSession
 )
 
+# ✅ 비동기 Redis 클라이언트 (async 핸들러에서 await로 사용)
 redis_client = redis.Redis(
     host=REDIS_HOST,
     port=REDIS_PORT,
@@ -1,15 +1,28 @@
 # app/db_ai.py
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.config import AI_DB_URL
-
-ai_engine = create_async_engine(
+from app.config import (
     AI_DB_URL,
-    pool_size=10,          # 🔥 기본 5 → 10
-    max_overflow=20,       # 🔥 기본 10 → 20
-    pool_recycle=1800,     # 🔥 30분
-    pool_pre_ping=True,
+    DB_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_TIMEOUT,
 )
+from app.db import engine
+
+# AI DB가 Primary DB와 같으면 풀을 따로 만들지 않고 공유
+if AI_DB_URL == DB_URL:
+    ai_engine = engine
+else:
+    ai_engine = create_async_engine(
+        AI_DB_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
 
 AsyncAISessionLocal = sessionmaker(
     ai_engine,
@@ -0,0 +1,96 @@
+# app/events.py
+import json
+import time
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import SSE_HEARTBEAT_SECONDS, SSE_MAX_DURATION_SECONDS
+from app.db import redis_client
+from app.tasks import STATE_FIELDS, VARIANTS, get_task, public_status, task_events_channel
+
+# ======================================================
+# 작업 상태 push (Server-Sent Events)
+#   1) task_events:{task_id} 구독
+#   2) 현재 상태 스냅샷 1회 전송 (구독 후에 읽으므로 사이에 놓치는 이벤트 없음)
+#   3) 이후 상태 전이를 그대로 전달, 최종 상태가 되면 종료
+# ======================================================
+
+
+def is_final(task: dict) -> bool:
+    status = task.get("status")
+    if status == "FAILED":
+        return True
+    if status != "COMPLETED":
+        return False
+    # variant 상태가 기록된 경우 모두 끝났을 때만 종료
+    for variant in VARIANTS:
+        value = task.get(f"{variant}_status")
+        if value and value not in ("READY", "FAILED"):
+            return False
+    return True
+
+
+def _sse(data: dict) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _apply_event(task: dict, event: str):
+    """이벤트 이름으로 로컬 스냅샷을 갱신 (v1_READY → v1_status=READY)"""
+    for variant in VARIANTS:
+        prefix = f"{variant}_"
+        if event.startswith(prefix):
+            task[f"{variant}_status"] = event[len(prefix):]
+            return
+    task["status"] = event
+
+
+async def _event_stream(request: Request, task_id: str):
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(task_events_channel(task_id))
+    try:
+        # 구독 이후 최신 상태를 다시 읽어 스냅샷으로 전송
+        task = await get_task(task_id, *STATE_FIELDS)
+        yield _sse({**public_status(task_id, task), "event": "snapshot"})
+        if is_final(task):
+            return
+
+        deadline = time.monotonic() + SSE_MAX_DURATION_SECONDS
+        while time.monotonic() < deadline:
+            if await request.is_disconnected():
+                return
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=SSE_HEARTBEAT_SECONDS,
+            )
+            if message is None:
+                # 프록시 idle timeout 방지용 heartbeat (SSE 주석)
+                yield ": keep-alive\n\n"
+                continue
+
+            payload = json.loads(message["data"])
+            _apply_event(task, payload["event"])
+            yield _sse(payload)
+            if is_final(task):
+                return
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.close()
+
+
+async def task_event_response(request: Request, task_id: str, user_id: str):
+    task = await get_task(task_id, *STATE_FIELDS)
+    if not task.get("user_id"):
+        raise HTTPException(404, "Task not found")
+    if task["user_id"] != user_id:
+        raise HTTPException(403, "Forbidden")
+
+    return StreamingResponse(
+        _event_stream(request, task_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx가 응답을 버퍼링하지 않도록
+            "X-Accel-Buffering": "no",
+        },
+    )
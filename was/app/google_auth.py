@@ -1,14 +1,20 @@
 # app/google_auth.py
 import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import timezone
 
 from sqlalchemy import text
-from sqlalchemy import create_engine
 
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 
-from app.config import DB_URL
+from app.config import YOUTUBE_CREDENTIALS_CACHE_SIZE, YOUTUBE_CREDENTIALS_CACHE_TTL_SECONDS
+from app.db import AsyncSessionLocal
 
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 
@@ -19,14 +25,6 @@ YOUTUBE_SCOPES = [
     "https://www.googleapis.com/auth/youtube.upload",
 ]
 
-# ======================================================
-# 🔥 동기 DB 엔진 (YouTube 전용)
-# ======================================================
-sync_engine = create_engine(
-    DB_URL.replace("+asyncpg", ""),  # async 제거
-    pool_pre_ping=True,
-)
-
 # ======================================================
 # 기존 로그인 로직 (유지)
 # ======================================================
@@ -53,44 +51,146 @@ async def fetch_userinfo(access_token: str) -> dict:
         return resp.json()
 
 # ======================================================
-# 🔥 YouTube 업로드용 (SYNC, 핵심)
+# 🔥 YouTube 업로드용 (유저별 credentials / service 캐시)
+#   - credentials는 유저당 1개를 LRU/TTL로 캐시 (만료 시 refresh 후 DB에 비동기 저장)
+#   - googleapiclient service는 스레드 안전하지 않으므로
+#     유저별 idle 목록에서 빌려 쓰고 돌려놓음 (동시 업로드 시에만 추가 생성)
 # ======================================================
-def get_youtube_service(user_id: str):
-    with sync_engine.connect() as conn:
-        row = conn.execute(
+class _CachedCredentials:
+    def __init__(self, creds: Credentials):
+        self.creds = creds
+        self.persisted_token = creds.token
+        self.loaded_at = time.monotonic()
+        self.idle_services = []
+
+
+_credentials_cache: "OrderedDict[str, _CachedCredentials]" = OrderedDict()
+# 토큰 저장 태스크가 GC로 사라지지 않도록 끝날 때까지 참조 유지
+_background_tasks: set = set()
+
+
+async def _load_token_row(user_id: str):
+    # 공용 async 엔진(app.db) 사용 - 별도 동기 풀 없음
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
             text("""
                 SELECT access_token, refresh_token, expires_at
                 FROM oauth_tokens
                 WHERE user_id = :uid
             """),
             {"uid": user_id},
-        ).fetchone()
+        )
+        return res.first()
 
-    if not row:
-        raise Exception("Google OAuth token not found")
 
+def _build_credentials(row) -> Credentials:
     access_token, refresh_token, expires_at = row
 
-    # ✅ 여기만 수정됨 (timezone 처리)
+    # google-auth는 naive UTC datetime으로 만료를 비교
     expiry = None
     if expires_at:
-        if expires_at.tzinfo is None:
-            expiry = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at.tzinfo is not None:
+            expiry = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
         else:
             expiry = expires_at
 
-    creds = Credentials(
+    return Credentials(
         token=access_token,
         refresh_token=refresh_token,
         token_uri=GOOGLE_TOKEN_URL,
         client_id=GOOGLE_CLIENT_ID,
         client_secret=GOOGLE_CLIENT_SECRET,
         scopes=YOUTUBE_SCOPES,
+        expiry=expiry,
     )
 
+
+def _build_service(creds: Credentials):
     return build(
         "youtube",
         "v3",
         credentials=creds,
         cache_discovery=False,
     )
+
+
+def invalidate_youtube_credentials(user_id: str):
+    """재로그인 등으로 DB 토큰이 바뀌었을 때 캐시를 버립니다."""
+    _credentials_cache.pop(user_id, None)
+
+
+async def _get_credentials(user_id: str) -> _CachedCredentials:
+    entry = _credentials_cache.get(user_id)
+    if entry and time.monotonic() - entry.loaded_at < YOUTUBE_CREDENTIALS_CACHE_TTL_SECONDS:
+        _credentials_cache.move_to_end(user_id)
+        return entry
+
+    row = await _load_token_row(user_id)
+    if not row:
+        raise Exception("Google OAuth token not found")
+
+    entry = _CachedCredentials(_build_credentials(row))
+    _credentials_cache[user_id] = entry
+    _credentials_cache.move_to_end(user_id)
+    while len(_credentials_cache) > YOUTUBE_CREDENTIALS_CACHE_SIZE:
+        _credentials_cache.popitem(last=False)
+    return entry
+
+
+async def _persist_token(user_id: str, access_token: str, expiry):
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                text("""
+                    UPDATE oauth_tokens
+                    SET access_token = :access, expires_at = :expires
+                    WHERE user_id = :uid
+                """),
+                {"uid": user_id, "access": access_token, "expires": expiry},
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"⚠️ Failed to persist refreshed token for {user_id}: {e}")
+
+
+def _persist_if_refreshed(user_id: str, entry: _CachedCredentials):
+    """refresh된 토큰을 백그라운드로 oauth_tokens에 기록 (업로드 경로를 기다리게 하지 않음)"""
+    creds = entry.creds
+    if creds.token and creds.token != entry.persisted_token:
+        entry.persisted_token = creds.token
+        task = asyncio.create_task(_persist_token(user_id, creds.token, creds.expiry))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def _ensure_fresh(user_id: str, entry: _CachedCredentials) -> _CachedCredentials:
+    if entry.creds.valid:
+        return entry
+    try:
+        await asyncio.to_thread(entry.creds.refresh, GoogleAuthRequest())
+    except RefreshError:
+        # 다른 pod에서 재로그인해 refresh token이 바뀌었을 수 있으므로 DB에서 한 번 더 읽음
+        invalidate_youtube_credentials(user_id)
+        entry = await _get_credentials(user_id)
+        if not entry.creds.valid:
+            await asyncio.to_thread(entry.creds.refresh, GoogleAuthRequest())
+    _persist_if_refreshed(user_id, entry)
+    return entry
+
+
+@asynccontextmanager
+async def youtube_service(user_id: str):
+    """
+    async with youtube_service(user_id) as youtube:
+        await loop.run_in_executor(..., upload(youtube))
+    """
+    entry = await _ensure_fresh(user_id, await _get_credentials(user_id))
+    service = entry.idle_services.pop() if entry.idle_services else await asyncio.to_thread(_build_service, entry.creds)
+    try:
+        yield service
+    finally:
+        # 업로드 도중 googleapiclient가 401로 자동 refresh 했을 수도 있음
+        _persist_if_refreshed(user_id, entry)
+        if _credentials_cache.get(user_id) is entry:
+            entry.idle_services.append(service)
+
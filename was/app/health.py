@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from sqlalchemy import text
 from app.db import engine, redis_client
+from app.monitor import loop_stats
 
 router = APIRouter()
 
@@ -8,5 +9,5 @@ router = APIRouter()
 async def health():
     async with engine.begin() as conn:
         await conn.execute(text("SELECT 1"))
-    redis_client.ping()
-    return {"status": "ok"}
+    await redis_client.ping()
+    return {"status": "ok", "event_loop": loop_stats()}
@@ -0,0 +1,131 @@
+# app/hls.py
+import re
+import hmac
+import time
+import asyncio
+import hashlib
+import posixpath
+from urllib.parse import urlencode
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from app.config import JWT_SECRET_KEY, HLS_URL_EXPIRES_SECONDS, PRESIGN_CACHE_MARGIN_SECONDS
+from app.db import redis_client
+from app.s3_client import hls_object_prefix, get_object_text, presign_key_url
+from app.tasks import VARIANTS
+
+HLS_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+
+_RENDITION_RE = re.compile(r"^r\d+$")
+_MAP_URI_RE = re.compile(r'(#EXT-X-MAP:.*URI=")([^"]+)(")')
+
+# ======================================================
+# HLS 재생목록
+#   url          : JWT로 인증, 서명(uid/exp/sig)이 붙은 master.m3u8 주소를 반환
+#   master.m3u8  : 플레이어는 헤더를 못 붙이므로 서명으로 인증,
+#                  각 단계(r0, r1 ...) URI에도 서명을 붙여 반환
+#   r{i}/index.m3u8 : 서명으로 인증, init/세그먼트 URI를 S3 presigned URL로 바꿔 반환
+# ======================================================
+
+
+def _validate(variant: str, rendition: str = None):
+    if variant not in VARIANTS:
+        raise HTTPException(400, f"variant must be one of {VARIANTS}")
+    if rendition is not None and not _RENDITION_RE.match(rendition):
+        raise HTTPException(404, "Playlist not found")
+
+
+def _signature(user_id: str, task_id: str, variant: str, exp: int) -> str:
+    message = f"{user_id}/{task_id}/{variant}:{exp}".encode("utf-8")
+    return hmac.new(JWT_SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def _signed_query(user_id: str, task_id: str, variant: str) -> str:
+    exp = int(time.time()) + HLS_URL_EXPIRES_SECONDS
+    return urlencode({"uid": user_id, "exp": exp, "sig": _signature(user_id, task_id, variant, exp)})
+
+
+def _verify(uid: str, task_id: str, variant: str, exp: int, sig: str):
+    if exp < time.time():
+        raise HTTPException(403, "Playlist URL expired")
+    if not hmac.compare_digest(sig, _signature(uid, task_id, variant, exp)):
+        raise HTTPException(403, "Invalid playlist signature")
+
+
+async def _read_playlist(key: str) -> str:
+    try:
+        return await asyncio.to_thread(get_object_text, key)
+    except ClientError:
+        raise HTTPException(404, "Playlist not found")
+
+
+def _playlist_response(body: str) -> Response:
+    # 서명/presigned URL이 들어 있으므로 공유 캐시에 저장되지 않도록 private
+    return Response(body, media_type=HLS_MEDIA_TYPE, headers={"Cache-Control": "private, max-age=60"})
+
+
+def master_playlist_url(user_id: str, task_id: str, variant: str, master_path: str) -> dict:
+    """JWT로 인증된 요청에만 발급. 플레이어에는 이 주소를 그대로 넘기면 됩니다."""
+    _validate(variant)
+    return {
+        "url": f"{master_path}?{_signed_query(user_id, task_id, variant)}",
+        "expires_in": HLS_URL_EXPIRES_SECONDS,
+    }
+
+
+async def master_playlist_response(task_id: str, variant: str, uid: str, exp: int, sig: str) -> Response:
+    _validate(variant)
+    _verify(uid, task_id, variant, exp, sig)
+    prefix = hls_object_prefix(uid, task_id, variant)
+    master = await _read_playlist(f"{prefix}/master.m3u8")
+
+    query = _signed_query(uid, task_id, variant)
+    lines = [
+        f"{line}?{query}" if line and not line.startswith("#") else line
+        for line in master.splitlines()
+    ]
+    return _playlist_response("\n".join(lines) + "\n")
+
+
+async def _rewrite_media_playlist(playlist_key: str) -> str:
+    """상대 URI(init.mp4, seg_000.m4s ...)를 presigned URL로 교체. 결과는 Redis에 캐시"""
+    cache_key = f"hls_playlist:{playlist_key}"
+    cached = await redis_client.get(cache_key)
+    if cached:
+        return cached
+
+    playlist = await _read_playlist(playlist_key)
+    base = posixpath.dirname(playlist_key)
+
+    def _sign(uri: str) -> str:
+        return presign_key_url(posixpath.normpath(posixpath.join(base, uri)), HLS_URL_EXPIRES_SECONDS)
+
+    def _rewrite() -> str:
+        lines = []
+        for line in playlist.splitlines():
+            if line.startswith("#EXT-X-MAP:"):
+                line = _MAP_URI_RE.sub(lambda m: m.group(1) + _sign(m.group(2)) + m.group(3), line)
+            elif line and not line.startswith("#"):
+                line = _sign(line)
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+    # 세그먼트 수만큼 서명하므로 스레드에서 수행
+    body = await asyncio.to_thread(_rewrite)
+    ttl = HLS_URL_EXPIRES_SECONDS - PRESIGN_CACHE_MARGIN_SECONDS
+    if ttl > 0:
+        await redis_client.set(cache_key, body, ex=ttl)
+    return body
+
+
+async def media_playlist_response(
+    task_id: str, variant: str, rendition: str, uid: str, exp: int, sig: str
+) -> Response:
+    _validate(variant, rendition)
+    _verify(uid, task_id, variant, exp, sig)
+
+    prefix = hls_object_prefix(uid, task_id, variant)
+    body = await _rewrite_media_playlist(f"{prefix}/{rendition}/index.m3u8")
+    return _playlist_response(body)
@@ -0,0 +1,268 @@
+# app/ingest.py
+import os
+import json
+import time
+import asyncio
+import tempfile
+from typing import Optional
+
+import httpx
+
+from app.config import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_TIMEOUT_SECONDS,
+    INGEST_CONCURRENCY,
+    INGEST_QUEUE_SIZE,
+)
+from app.db import redis_client
+from app.s3_client import upload_video, upload_thumbnail
+from app.ai import insert_final_video, insert_operation_log
+from app.video_index import add_video
+from app.tasks import update_task
+
+# Worker 작업 스트림 (consumer group 으로 ack / 재시도 처리)
+REDIS_STREAM = os.getenv("REDIS_STREAM", "video_processing_stream")
+
+# 콜백 → ingest 워커 사이의 in-process 큐 (크기 제한 = 백프레셔)
+_queue: Optional[asyncio.Queue] = None
+_workers: list = []
+
+SHUTDOWN_ERROR = "Server shutting down"
+
+
+# ======================================================
+# KIE 결과 영상 스트리밍 다운로드 (video / video2 공용)
+# ======================================================
+async def download_to_file(url: str, dst: str) -> int:
+    """
+    결과 영상을 청크 단위로 받아 dst 파일에 바로 씁니다.
+    응답 전체를 메모리에 올리지 않으므로 콜백당 메모리는 청크 크기로 제한됩니다.
+    반환값: 기록한 바이트 수
+    """
+    written = 0
+    async with httpx.AsyncClient(timeout=DOWNLOAD_TIMEOUT_SECONDS, follow_redirects=True) as client:
+        async with client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            with open(dst, "wb") as f:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+    return written
+
+
+# ======================================================
+# 썸네일 추출 (비동기 subprocess - 이벤트 루프를 막지 않음)
+# ======================================================
+async def extract_thumbnail(video_path: str, thumb_path: str):
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-y", "-i", video_path, "-ss", "00:00:01", "-vframes", "1", thumb_path,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    returncode = await proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg thumbnail failed (exit {returncode})")
+
+
+# ======================================================
+# ffprobe (Worker가 다시 probe하지 않도록 결과를 job에 실어 보냄)
+# ======================================================
+async def probe_video(video_path: str) -> Optional[dict]:
+    """렌더링 계획에 필요한 값만 반환합니다. 실패하면 None (Worker가 직접 probe)."""
+    proc = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error", "-print_format", "json", "-show_streams", "-show_format", video_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    stdout, _ = await proc.communicate()
+    if proc.returncode != 0:
+        return None
+    try:
+        data = json.loads(stdout)
+    except json.JSONDecodeError:
+        return None
+
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    rotation = int(float(video.get("tags", {}).get("rotate", 0) or 0))
+    for side_data in video.get("side_data_list", []):
+        if "rotation" in side_data:
+            rotation = int(side_data["rotation"])
+    width, height = int(video.get("width", 0)), int(video.get("height", 0))
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+
+    return {
+        "width": width,
+        "height": height,
+        "sar": video.get("sample_aspect_ratio", "1:1"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "duration": float(data.get("format", {}).get("duration", 0) or 0),
+    }
+
+
+# ======================================================
+# 콜백에서 호출: 작업 등록만 하고 즉시 반환
+# ======================================================
+def enqueue_ingest(
+    *,
+    task_id: str,
+    user_id: str,
+    video_url: str,
+    prompt: str,
+    source: str,
+    log_type: str,
+) -> bool:
+    """
+    후처리 작업을 큐에 넣습니다.
+    큐가 가득 찼거나 워커가 떠 있지 않으면 False를 반환합니다.
+    """
+    if _queue is None:
+        return False
+    try:
+        _queue.put_nowait(
+            {
+                "task_id": task_id,
+                "user_id": user_id,
+                "video_url": video_url,
+                "prompt": prompt,
+                "source": source,
+                "log_type": log_type,
+            }
+        )
+        return True
+    except asyncio.QueueFull:
+        return False
+
+
+# ======================================================
+# 실제 후처리 (다운로드 → 썸네일 → S3 → DB → Worker 큐)
+# ======================================================
+async def process_ingest_job(job: dict):
+    task_id = job["task_id"]
+    user_id = job["user_id"]
+    prompt = job["prompt"]
+    log_type = job["log_type"]
+
+    tmp_video = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+    tmp_thumb = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg").name
+
+    try:
+        # ✅ 전체 응답을 메모리에 올리지 않고 청크 단위로 임시 파일에 기록
+        await download_to_file(job["video_url"], tmp_video)
+
+        # 썸네일 추출과 ffprobe를 동시에
+        _, media = await asyncio.gather(
+            extract_thumbnail(tmp_video, tmp_thumb),
+            probe_video(tmp_video),
+        )
+
+        # ✅ 원본 업로드 (variant=None 사용) - boto3 동기 호출은 스레드에서 실행
+        await asyncio.gather(
+            asyncio.to_thread(upload_video, user_id, task_id, tmp_video),
+            asyncio.to_thread(upload_thumbnail, user_id, task_id, tmp_thumb),
+        )
+        await add_video(user_id, task_id)
+
+        await insert_final_video(
+            video_key=task_id,
+            user_id=user_id,
+            title=prompt[:50],
+            description=prompt
+        )
+
+        # ✅ Worker에게 작업 전달 (v1, v2 생성을 위해)
+        job_payload = {
+            "task_id": task_id,
+            "input_key": f"{user_id}/{task_id}.mp4",
+            "output_key": f"{user_id}/{task_id}_processed.mp4",
+            "source": job["source"],
+        }
+        if media:
+            job_payload["probe"] = media
+        # variant 상태는 Worker가 READY로 갱신하므로 큐에 넣기 전에 먼저 기록
+        await update_task(task_id, v1_status="PENDING", v2_status="PENDING")
+        await redis_client.xadd(REDIS_STREAM, {"job": json.dumps(job_payload), "attempt": 1})
+        print(f"🚀 [ingest] Job pushed to Redis for Worker: {task_id}")
+
+        await insert_operation_log(
+            user_id=user_id,
+            log_type=log_type,
+            status="SUCCESS",
+            video_key=task_id,
+            message="Callback processed successfully"
+        )
+
+        await update_task(task_id, status="COMPLETED", completed_at=time.time())
+
+    except asyncio.CancelledError:
+        # 종료 시 취소된 작업이 PROCESSING으로 남지 않도록 기록 후 다시 전파
+        await update_task(task_id, status="FAILED", error=SHUTDOWN_ERROR)
+        raise
+    except Exception as e:
+        print(f"Callback processing error: {e}")
+        await update_task(task_id, status="FAILED", error=str(e)[:500])
+        try:
+            await insert_operation_log(
+                user_id=user_id,
+                log_type=log_type,
+                status="FAILED",
+                video_key=task_id,
+                message=str(e)
+            )
+        except Exception:
+            pass
+    finally:
+        if os.path.exists(tmp_video): os.remove(tmp_video)
+        if os.path.exists(tmp_thumb): os.remove(tmp_thumb)
+
+
+async def _worker_loop(worker_no: int):
+    while True:
+        job = await _queue.get()
+        try:
+            await process_ingest_job(job)
+        except Exception as e:
+            # process_ingest_job 내부에서 처리되지 않은 예외도 워커를 죽이지 않음
+            print(f"❌ [ingest-{worker_no}] Unexpected error: {e}")
+        finally:
+            _queue.task_done()
+
+
+# ======================================================
+# 앱 수명주기 (main.py startup / shutdown 에서 호출)
+# ======================================================
+async def start_ingest_workers():
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+    for i in range(INGEST_CONCURRENCY):
+        _workers.append(asyncio.create_task(_worker_loop(i)))
+    print(f"🧵 Ingest workers started (concurrency={INGEST_CONCURRENCY}, queue={INGEST_QUEUE_SIZE})")
+
+
+async def stop_ingest_workers(timeout: float = 30.0):
+    global _queue
+    if _queue is None:
+        return
+    # 진행 중인 작업은 가능한 한 마무리하고 종료
+    try:
+        await asyncio.wait_for(_queue.join(), timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ [ingest] {_queue.qsize()} job(s) dropped on shutdown")
+    # 진행 중인 작업은 취소 → process_ingest_job이 FAILED로 기록
+    for w in _workers:
+        w.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    # 아직 시작하지 못한 작업도 FAILED로 기록 (클라이언트가 무한 대기하지 않도록)
+    while not _queue.empty():
+        job = _queue.get_nowait()
+        try:
+            await update_task(job["task_id"], status="FAILED", error=SHUTDOWN_ERROR)
+        except Exception as e:
+            print(f"❌ [ingest] Failed to mark {job['task_id']} as FAILED: {e}")
+    _workers.clear()
+    _queue = None
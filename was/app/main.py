@@ -5,6 +5,9 @@ from app.auth import router as auth_router
 from app.video import router as video_router
 from app.video2 import router as video2_router
 from app.health import router as health_router
+from app.ingest import start_ingest_workers, stop_ingest_workers
+from app.youtube_jobs import start_youtube_workers, stop_youtube_workers
+from app.monitor import start_loop_monitor, stop_loop_monitor
 
 # MinIO 관련 import 삭제
 
@@ -15,6 +18,22 @@ app = FastAPI(
 
 # Startup 이벤트 삭제 (S3는 ensure_bucket 불필요)
 
+# =========================
+# 콜백 후처리 파이프라인 (ingest) / YouTube 업로드 작업 / 루프 감시 수명주기
+# =========================
+@app.on_event("startup")
+async def startup():
+    start_loop_monitor()
+    await start_ingest_workers()
+    await start_youtube_workers()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_youtube_workers()
+    await stop_ingest_workers()
+    await stop_loop_monitor()
+
 # =========================
 # CORS 설정
 # =========================
@@ -0,0 +1,61 @@
+# app/monitor.py
+import asyncio
+import time
+from typing import Optional
+
+from app.config import (
+    LOOP_MONITOR_ENABLED,
+    LOOP_MONITOR_INTERVAL_MS,
+    LOOP_STALL_THRESHOLD_MS,
+)
+
+# ======================================================
+# 이벤트 루프 정지(stall) 감시
+#   일정 간격으로 sleep 후 실제 경과 시간을 재서,
+#   예정보다 LOOP_STALL_THRESHOLD_MS 이상 늦게 깨어나면
+#   누군가 루프를 블로킹한 것으로 보고 기록합니다.
+# ======================================================
+_stats = {
+    "stall_count": 0,
+    "max_lag_ms": 0.0,
+    "last_stall_at": None,
+}
+_task: Optional[asyncio.Task] = None
+
+
+def loop_stats() -> dict:
+    return {**_stats, "threshold_ms": LOOP_STALL_THRESHOLD_MS}
+
+
+async def _watch():
+    interval = LOOP_MONITOR_INTERVAL_MS / 1000
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag_ms = (time.perf_counter() - started - interval) * 1000
+
+        if lag_ms > _stats["max_lag_ms"]:
+            _stats["max_lag_ms"] = round(lag_ms, 1)
+        if lag_ms >= LOOP_STALL_THRESHOLD_MS:
+            _stats["stall_count"] += 1
+            _stats["last_stall_at"] = time.time()
+            print(f"⚠️ [loop-monitor] Event loop stalled for {lag_ms:.0f}ms")
+
+
+def start_loop_monitor():
+    global _task
+    if not LOOP_MONITOR_ENABLED or _task is not None:
+        return
+    loop = asyncio.get_running_loop()
+    # asyncio debug 모드일 때 느린 콜백 로그 기준도 같은 임계값 사용
+    loop.slow_callback_duration = LOOP_STALL_THRESHOLD_MS / 1000
+    _task = asyncio.create_task(_watch())
+
+
+async def stop_loop_monitor():
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    await asyncio.gather(_task, return_exceptions=True)
+    _task = None
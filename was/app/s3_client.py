@@ -1,3 +1,4 @@
+import io
 import os
 import boto3
 from botocore.exceptions import ClientError
@@ -56,18 +57,78 @@ def upload_thumbnail(user_id: str, task_id: str, thumb_path: str):
 # ==============================
 # 2. 스트리밍 로직 (variant 대응)
 # ==============================
-def get_video_stream(user_id: str, task_id: str, variant: str = None):
-    """S3 객체의 Body(스트림)를 반환합니다."""
+def get_video_object(user_id: str, task_id: str, variant: str = None, byte_range: str = None):
+    """
+    S3 get_object 응답 전체(Body, ContentLength, ContentRange 등)를 반환합니다.
+    byte_range가 있으면 "bytes=0-1023" 형식 그대로 S3 Range 요청으로 전달합니다.
+    """
     filename = f"{task_id}_{variant}.mp4" if variant else f"{task_id}.mp4"
     key = f"{user_id}/{filename}"
-    
+
+    params = {"Bucket": AWS_S3_BUCKET, "Key": key}
+    if byte_range:
+        params["Range"] = byte_range
+
     try:
-        obj = s3_client.get_object(Bucket=AWS_S3_BUCKET, Key=key)
-        return obj['Body']
+        return s3_client.get_object(**params)
     except ClientError as e:
-        print(f"❌ S3 스트림 에러: {e} (Key: {key})")
+        print(f"❌ S3 스트림 에러: {e} (Key: {key}, Range: {byte_range})")
         raise
 
+def get_video_size(user_id: str, task_id: str, variant: str = None) -> int:
+    """S3 객체 크기(bytes)를 반환합니다. (416 응답용)"""
+    filename = f"{task_id}_{variant}.mp4" if variant else f"{task_id}.mp4"
+    key = f"{user_id}/{filename}"
+    obj = s3_client.head_object(Bucket=AWS_S3_BUCKET, Key=key)
+    return obj["ContentLength"]
+
+class S3RangeReader(io.RawIOBase):
+    """
+    S3 객체를 seek 가능한 파일처럼 읽습니다. read()마다 필요한 구간만 Range GET 하므로
+    메모리 사용량은 한 번에 읽는 크기(청크)로 제한됩니다. (MediaIoBaseUpload 입력용)
+    """
+
+    def __init__(self, key: str):
+        super().__init__()
+        self.key = key
+        self.size = s3_client.head_object(Bucket=AWS_S3_BUCKET, Key=key)["ContentLength"]
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def read(self, size=-1):
+        if self._pos >= self.size:
+            return b""
+        end = self.size - 1 if size is None or size < 0 else min(self.size, self._pos + size) - 1
+        obj = s3_client.get_object(Bucket=AWS_S3_BUCKET, Key=self.key, Range=f"bytes={self._pos}-{end}")
+        data = obj["Body"].read()
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
 def get_thumbnail_stream(user_id: str, task_id: str):
     """S3 썸네일 객체의 Body를 반환합니다."""
     key = f"{user_id}/{task_id}.jpg"
@@ -79,40 +140,75 @@ def get_thumbnail_stream(user_id: str, task_id: str):
         raise
 
 # ==============================
-# 3. 리스트 로직 (최소 수정)
+# 2.5. Presigned URL (직접 다운로드용)
 # ==============================
-def list_user_videos(user_id: str):
+def video_object_key(user_id: str, task_id: str, variant: str = None) -> str:
+    filename = f"{task_id}_{variant}.mp4" if variant else f"{task_id}.mp4"
+    return f"{user_id}/{filename}"
+
+def thumbnail_object_key(user_id: str, task_id: str) -> str:
+    return f"{user_id}/{task_id}.jpg"
+
+def hls_object_prefix(user_id: str, task_id: str, variant: str) -> str:
+    """Worker가 올린 HLS 결과물 위치 ({user_id}/{task_id}/hls/{variant}/master.m3u8)"""
+    return f"{user_id}/{task_id}/hls/{variant}"
+
+def presign_object_url(key: str, expires_in: int, content_type: str = None) -> str:
     """
-    해당 유저의 모든 mp4 파일명을 반환합니다.
-    ✅ 최소 수정: S3에 있는 원본/버전(v1,v2)을 task_id 기준으로 묶어서 1개만 반환합니다.
-    예: ["task123", "task123_v1", "task123_v2"] → ["task123"]
+    객체 존재를 확인한 뒤 GET presigned URL을 발급합니다.
+    객체가 없으면 ClientError(404)를 그대로 올립니다.
     """
-    prefix = f"{user_id}/"
-    try:
-        response = s3_client.list_objects_v2(Bucket=AWS_S3_BUCKET, Prefix=prefix)
-        if 'Contents' not in response:
-            return []
-        
-        tasks = set()
-
-        for obj in response['Contents']:
-            key = obj['Key']
-            filename = key.split("/")[-1]
+    s3_client.head_object(Bucket=AWS_S3_BUCKET, Key=key)
 
-            if filename.endswith(".mp4"):
-                base = filename.replace(".mp4", "")
+    params = {"Bucket": AWS_S3_BUCKET, "Key": key}
+    if content_type:
+        params["ResponseContentType"] = content_type
+    return s3_client.generate_presigned_url(
+        "get_object",
+        Params=params,
+        ExpiresIn=expires_in,
+    )
 
-                # task123_v1 / task123_v2 형태면 base task_id만 추출
-                if base.endswith("_v1") or base.endswith("_v2"):
-                    task_id = base.rsplit("_", 1)[0]
-                else:
-                    task_id = base
+def presign_key_url(key: str, expires_in: int) -> str:
+    """존재 확인(head_object) 없이 서명만 합니다. (HLS 세그먼트처럼 개수가 많은 경우)"""
+    return s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": AWS_S3_BUCKET, "Key": key},
+        ExpiresIn=expires_in,
+    )
 
-                tasks.add(task_id)
+def get_object_text(key: str) -> str:
+    obj = s3_client.get_object(Bucket=AWS_S3_BUCKET, Key=key)
+    return obj["Body"].read().decode("utf-8")
 
-        # 최신순 정렬 (기존처럼 문자열 기준 내림차순)
-        return sorted(tasks, reverse=True)
+# ==============================
+# 3. 리스트 로직 (페이지네이션)
+# ==============================
+def _task_id_from_filename(filename: str):
+    """task123.mp4 / task123_v1.mp4 / task123_v2.mp4 → task123 (mp4가 아니면 None)"""
+    if not filename.endswith(".mp4"):
+        return None
+    base = filename[: -len(".mp4")]
+    # task123_v1 / task123_v2 형태면 base task_id만 추출
+    if base.endswith("_v1") or base.endswith("_v2"):
+        return base.rsplit("_", 1)[0]
+    return base
 
-    except ClientError as e:
-        print(f"❌ S3 목록 조회 에러: {e}")
-        return []
+def list_user_video_entries(user_id: str) -> dict:
+    """
+    해당 유저 prefix 아래 전체 객체를 페이지 단위(1,000개씩)로 끝까지 조회해
+    {task_id: 가장 이른 LastModified(epoch seconds)} 를 반환합니다.
+    """
+    prefix = f"{user_id}/"
+    tasks = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    # Delimiter로 하위 폴더({task_id}/hls/...)는 제외하고 바로 아래 객체만 조회
+    for page in paginator.paginate(Bucket=AWS_S3_BUCKET, Prefix=prefix, Delimiter="/"):
+        for obj in page.get("Contents", []):
+            task_id = _task_id_from_filename(obj["Key"].split("/")[-1])
+            if not task_id:
+                continue
+            ts = obj["LastModified"].timestamp()
+            if task_id not in tasks or ts < tasks[task_id]:
+                tasks[task_id] = ts
+    return tasks
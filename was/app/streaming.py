@@ -0,0 +1,137 @@
+# app/streaming.py
+import re
+import asyncio
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+
+from app.config import (
+    STREAM_CHUNK_SIZE,
+    VIDEO_DELIVERY_MODE,
+    PRESIGN_EXPIRES_SECONDS,
+    PRESIGN_CACHE_MARGIN_SECONDS,
+)
+from app.db import redis_client
+from app.s3_client import get_video_object, get_video_size, presign_object_url
+
+DELIVERY_MODES = ("proxy", "redirect", "json")
+
+# 단일 구간만 지원 (bytes=0-1023 / bytes=1024- / bytes=-500)
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range_header(range_header: Optional[str]) -> Optional[str]:
+    """
+    Range 헤더를 검사해 S3로 넘길 수 있는 형태면 그대로, 아니면 None을 반환합니다.
+    다중 구간(bytes=0-1,5-6)이나 잘못된 형식은 무시하고 전체 응답(200)으로 처리합니다.
+    """
+    if not range_header:
+        return None
+    value = range_header.strip().replace(" ", "")
+    m = _RANGE_RE.match(value)
+    if not m:
+        return None
+    start, end = m.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return value
+
+
+def _iter_body(body):
+    try:
+        for chunk in body.iter_chunks(STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        body.close()
+
+
+# ======================================================
+# 영상 스트리밍 응답 (200 전체 / 206 부분)
+# ======================================================
+async def video_response(user_id: str, task_id: str, variant: Optional[str], range_header: Optional[str]):
+    byte_range = parse_range_header(range_header)
+
+    try:
+        # boto3는 동기 클라이언트이므로 스레드에서 호출 (Body 순회는 StreamingResponse가 스레드풀에서 수행)
+        obj = await asyncio.to_thread(
+            get_video_object, user_id, task_id, variant=variant, byte_range=byte_range
+        )
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code == "InvalidRange":
+            try:
+                size = await asyncio.to_thread(get_video_size, user_id, task_id, variant=variant)
+            except ClientError:
+                raise HTTPException(404, "Video not found")
+            return Response(
+                status_code=416,
+                headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"},
+            )
+        raise HTTPException(404, "Video not found")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(obj["ContentLength"]),
+    }
+    status_code = 200
+    if byte_range and obj.get("ContentRange"):
+        headers["Content-Range"] = obj["ContentRange"]
+        status_code = 206
+    if obj.get("ETag"):
+        headers["ETag"] = obj["ETag"]
+
+    return StreamingResponse(
+        _iter_body(obj["Body"]),
+        status_code=status_code,
+        media_type="video/mp4",
+        headers=headers,
+    )
+
+
+# ======================================================
+# Presigned URL 전달 (redirect / json)
+# ======================================================
+def presign_cache_key(key: str) -> str:
+    return f"presign:{key}"
+
+
+def resolve_delivery_mode(delivery: Optional[str]) -> str:
+    mode = (delivery or VIDEO_DELIVERY_MODE).lower()
+    if mode not in DELIVERY_MODES:
+        raise HTTPException(400, f"delivery must be one of {DELIVERY_MODES}")
+    return mode
+
+
+async def get_presigned_url(key: str, content_type: str) -> str:
+    """
+    presigned URL을 Redis에 캐시해 두고 재사용합니다.
+    캐시 TTL은 URL 만료보다 PRESIGN_CACHE_MARGIN_SECONDS 만큼 짧습니다.
+    """
+    cache_key = presign_cache_key(key)
+    cached = await redis_client.get(cache_key)
+    if cached:
+        return cached
+
+    url = await asyncio.to_thread(
+        presign_object_url, key, PRESIGN_EXPIRES_SECONDS, content_type=content_type
+    )
+    ttl = PRESIGN_EXPIRES_SECONDS - PRESIGN_CACHE_MARGIN_SECONDS
+    if ttl > 0:
+        await redis_client.set(cache_key, url, ex=ttl)
+    return url
+
+
+async def presigned_response(key: str, content_type: str, mode: str, not_found: str):
+    # key는 항상 JWT의 user_id prefix 아래에서 만들어지므로 소유권이 보장됨
+    try:
+        url = await get_presigned_url(key, content_type)
+    except ClientError:
+        raise HTTPException(404, not_found)
+
+    if mode == "redirect":
+        return RedirectResponse(url, status_code=302)
+    return {"url": url}
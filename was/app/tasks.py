@@ -0,0 +1,172 @@
+# app/tasks.py
+import json
+import time
+
+from app.config import TASK_TTL_SECONDS
+from app.db import redis_client
+
+# ======================================================
+# 작업 상태 저장소
+#   task:{task_id}  (hash, TTL = TASK_TTL_SECONDS)
+#     user_id / prompt / source / status / error
+#     created_at / updated_at / completed_at
+#     {variant}_status     PENDING → CAPTIONING → RENDERING → UPLOADING → READY
+#                          (실패 시 RETRYING / FAILED, Worker가 갱신)
+#     {variant}_render_ms / _upload_ms / _ready_at / _error
+#   쓰기는 HSET + EXPIRE 를 파이프라인 1회, 읽기는 HMGET 1회로 처리합니다.
+#   상태 전이(status / {variant}_status)는 같은 파이프라인에서
+#   task_events:{task_id} 채널로 PUBLISH 됩니다. (SSE가 구독)
+# ======================================================
+
+VARIANTS = ("v1", "v2")
+VARIANT_FIELDS = ("status", "render_ms", "upload_ms", "ready_at", "error", "hls")
+
+# 상태 조회 / 스냅샷으로 내려주는 필드
+STATE_FIELDS = ("user_id", "status", "error") + tuple(
+    f"{variant}_{field}" for variant in VARIANTS for field in VARIANT_FIELDS
+)
+
+# 이전 배포에서 만들어진 개별 키 (TTL 만료 전까지만 fallback으로 읽음)
+_LEGACY_KEYS = {
+    "user_id": "task_user:{}",
+    "prompt": "task_prompt:{}",
+    "status": "task_status:{}",
+}
+
+
+def task_key(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def task_events_channel(task_id: str) -> str:
+    return f"task_events:{task_id}"
+
+
+def transition_events(fields: dict) -> list:
+    """
+    갱신 필드에서 상태 전이 이벤트 이름을 뽑습니다.
+    status=COMPLETED → "COMPLETED", v1_status=READY → "v1_READY"
+    """
+    events = []
+    if fields.get("status"):
+        events.append(fields["status"])
+    for variant in VARIANTS:
+        value = fields.get(f"{variant}_status")
+        if value:
+            events.append(f"{variant}_{value}")
+    return events
+
+
+async def create_task(task_id: str, *, user_id: str, prompt: str, source: str):
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(
+        task_key(task_id),
+        mapping={
+            "user_id": user_id,
+            "prompt": prompt,
+            "source": source,
+            "status": "QUEUED",
+            "created_at": now,
+            "updated_at": now,
+        },
+    )
+    pipe.expire(task_key(task_id), TASK_TTL_SECONDS)
+    pipe.publish(task_events_channel(task_id), json.dumps({"task_id": task_id, "event": "QUEUED"}))
+    await pipe.execute()
+
+
+async def update_task(task_id: str, **fields):
+    """지정한 필드만 갱신하고 updated_at / TTL 을 함께 갱신합니다."""
+    mapping = {k: v for k, v in fields.items() if v is not None}
+    mapping["updated_at"] = time.time()
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(task_key(task_id), mapping=mapping)
+    pipe.expire(task_key(task_id), TASK_TTL_SECONDS)
+    for event in transition_events(mapping):
+        pipe.publish(
+            task_events_channel(task_id),
+            json.dumps({"task_id": task_id, "event": event, "error": mapping.get("error")}),
+        )
+    await pipe.execute()
+
+
+async def get_task(task_id: str, *fields: str) -> dict:
+    """
+    요청한 필드를 HMGET 한 번으로 읽어 dict로 반환합니다.
+    해시가 없으면 이전 형식의 개별 키(task_user:/task_prompt:/task_status:)를 읽습니다.
+    """
+    values = await redis_client.hmget(task_key(task_id), fields)
+    result = dict(zip(fields, values))
+    if result.get("user_id") is not None or "user_id" not in fields:
+        return result
+
+    legacy = [f for f in fields if f in _LEGACY_KEYS and result[f] is None]
+    if not legacy:
+        return result
+    legacy_values = await redis_client.mget([_LEGACY_KEYS[f].format(task_id) for f in legacy])
+    # hash에 이미 있는 값(예: 콜백이 갱신한 status)은 그대로 두고 빈 필드만 채움
+    result.update(dict(zip(legacy, legacy_values)))
+    return result
+
+
+async def get_tasks(task_ids: list, *fields: str) -> dict:
+    """
+    여러 작업의 필드를 파이프라인 1회(HMGET × N)로 읽습니다.
+    해시가 없는 작업만 모아 이전 형식 키를 MGET 1회로 추가 조회합니다.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for task_id in task_ids:
+        pipe.hmget(task_key(task_id), fields)
+    rows = await pipe.execute()
+    result = {task_id: dict(zip(fields, values)) for task_id, values in zip(task_ids, rows)}
+
+    legacy_fields = [f for f in fields if f in _LEGACY_KEYS]
+    missing = [t for t in task_ids if result[t].get("user_id") is None]
+    if "user_id" in fields and legacy_fields and missing:
+        keys = [_LEGACY_KEYS[f].format(t) for t in missing for f in legacy_fields]
+        values = await redis_client.mget(keys)
+        for i, task_id in enumerate(missing):
+            chunk = values[i * len(legacy_fields):(i + 1) * len(legacy_fields)]
+            for field, value in zip(legacy_fields, chunk):
+                if result[task_id][field] is None:
+                    result[task_id][field] = value
+    return result
+
+
+def variant_states(task: dict) -> dict:
+    """
+    {variant}_* 필드를 variant별 dict로 묶습니다. (기록이 없는 variant는 제외)
+    {"v1": {"status": "READY", "render_ms": 5120, "ready_at": 1700000000.0}, ...}
+    """
+    variants = {}
+    for variant in VARIANTS:
+        status = task.get(f"{variant}_status")
+        if not status:
+            continue
+        state = {"status": status}
+        for field in ("render_ms", "upload_ms"):
+            if task.get(f"{variant}_{field}") is not None:
+                state[field] = int(task[f"{variant}_{field}"])
+        if task.get(f"{variant}_ready_at") is not None:
+            state["ready_at"] = float(task[f"{variant}_ready_at"])
+        if task.get(f"{variant}_hls"):
+            # HLS 재생목록 준비 여부 (READY면 /hls/{task_id}/{variant}/master.m3u8 사용 가능)
+            state["hls"] = task[f"{variant}_hls"]
+        if status in ("FAILED", "RETRYING") and task.get(f"{variant}_error"):
+            state["error"] = task[f"{variant}_error"]
+        variants[variant] = state
+    return variants
+
+
+def public_status(task_id: str, task: dict) -> dict:
+    """상태 조회 API 응답 형태"""
+    body = {"task_id": task_id, "status": task.get("status") or "UNKNOWN"}
+    if task.get("error"):
+        body["error"] = task["error"]
+    variants = variant_states(task)
+    if variants:
+        body["variants"] = variants
+    return body
+
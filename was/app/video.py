@@ -1,29 +1,25 @@
 import os
-import json
 import httpx
-import subprocess
-import tempfile
-import redis
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 from app.security import verify_jwt
+from app.config import VIDEO_LIST_DEFAULT_LIMIT, VIDEO_LIST_MAX_LIMIT, STATUS_BATCH_MAX
+from app.events import task_event_response
+from app.tasks import create_task, get_task, get_tasks, update_task, public_status, STATE_FIELDS
 from app.s3_client import (
-    upload_video,
-    upload_thumbnail,
-    get_video_stream,
     get_thumbnail_stream,
-    list_user_videos,
+    video_object_key,
+    thumbnail_object_key,
 )
-from app.ai import (
-    insert_final_video,
-    mark_youtube_uploaded,
-    insert_operation_log,
-)
-from app.google_auth import get_youtube_service
-from googleapiclient.http import MediaFileUpload
+from app.ingest import enqueue_ingest
+from app.video_index import list_videos_page
+from app.streaming import video_response, resolve_delivery_mode, presigned_response
+from app.hls import master_playlist_url, master_playlist_response, media_playlist_response
+from app.youtube_jobs import submit_upload, job_status
 
 router = APIRouter(tags=["video"])
 
@@ -34,15 +30,13 @@ KIE_API_URL = "https://api.kie.ai/api/v1/veo/generate"
 KIE_API_KEY = os.getenv("KIE_API_KEY")
 APP_BASE_URL = os.getenv("APP_BASE_URL", "https://auth.justic.store")
 
-REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-REDIS_PORT = int(os.getenv("APP_REDIS_PORT", "6379"))
-REDIS_QUEUE = os.getenv("REDIS_QUEUE", "video_processing_jobs")
-
-redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
 
 class GenerateRequest(BaseModel):
     prompt: str
 
+class BatchStatusRequest(BaseModel):
+    task_ids: List[str]
+
 class YoutubeUploadRequest(BaseModel):
     video_key: str
     title: str
@@ -82,9 +76,8 @@ async def generate_video(req: GenerateRequest, token_payload: dict = Depends(ver
     if not task_id:
         raise HTTPException(502, "KIE did not return taskId")
 
-    redis_client.set(f"task_user:{task_id}", user_id, ex=86400)
-    redis_client.set(f"task_prompt:{task_id}", req.prompt, ex=86400)
-    redis_client.set(f"task_status:{task_id}", "QUEUED", ex=86400)
+    # ✅ 작업 상태는 hash 하나에 파이프라인 1회로 기록
+    await create_task(task_id, user_id=user_id, prompt=req.prompt, source="video")
 
     return {"task_id": task_id, "status": "QUEUED"}
 
@@ -92,17 +85,45 @@ async def generate_video(req: GenerateRequest, token_payload: dict = Depends(ver
 # 1.5. 프론트 polling용 상태 조회
 # ==============================
 @router.get("/status/{task_id}")
-def get_status(task_id: str, token_payload: dict = Depends(verify_jwt)):
+async def get_status(task_id: str, token_payload: dict = Depends(verify_jwt)):
     user_id = token_payload["sub"]
 
-    owner = redis_client.get(f"task_user:{task_id}")
+    task = await get_task(task_id, *STATE_FIELDS)
+    owner = task["user_id"]
     if not owner:
         return {"task_id": task_id, "status": "NOT_FOUND"}
     if owner != user_id:
         raise HTTPException(403, "Forbidden")
 
-    status = redis_client.get(f"task_status:{task_id}") or "UNKNOWN"
-    return {"task_id": task_id, "status": status}
+    return public_status(task_id, task)
+
+# ==============================
+# 1.5.1. 여러 작업 상태 한 번에 조회
+# ==============================
+@router.post("/status:batch")
+async def get_status_batch(body: BatchStatusRequest, token_payload: dict = Depends(verify_jwt)):
+    user_id = token_payload["sub"]
+    task_ids = list(dict.fromkeys(body.task_ids))  # 중복 제거 (순서 유지)
+    if len(task_ids) > STATUS_BATCH_MAX:
+        raise HTTPException(400, f"Too many task_ids (max {STATUS_BATCH_MAX})")
+
+    tasks = await get_tasks(task_ids, *STATE_FIELDS)
+    statuses = {}
+    for task_id, task in tasks.items():
+        # 남의 작업은 존재 여부도 노출하지 않음
+        if task.get("user_id") != user_id:
+            statuses[task_id] = {"task_id": task_id, "status": "NOT_FOUND"}
+        else:
+            statuses[task_id] = public_status(task_id, task)
+    return {"statuses": statuses}
+
+# ==============================
+# 1.6. 상태 push (SSE) - polling 대체
+# ==============================
+@router.get("/events/{task_id}")
+async def task_events(task_id: str, request: Request, token_payload: dict = Depends(verify_jwt)):
+    user_id = token_payload["sub"]
+    return await task_event_response(request, task_id, user_id)
 
 # ==============================
 # 2. 비디오 생성 완료 콜백 (KIE -> WAS)
@@ -118,74 +139,29 @@ async def video_callback(request: Request):
     if not task_id or not video_url:
         return {"code": 200, "msg": "waiting"}
 
-    redis_client.set(f"task_status:{task_id}", "PROCESSING", ex=86400)
-
-    user_id = redis_client.get(f"task_user:{task_id}")
-    prompt = redis_client.get(f"task_prompt:{task_id}") or "Generated Video"
+    task = await get_task(task_id, "user_id", "prompt")
+    user_id = task["user_id"]
+    prompt = task["prompt"] or "Generated Video"
 
     if not user_id:
-        redis_client.set(f"task_status:{task_id}", "FAILED", ex=86400)
         return {"code": 200, "msg": "User mapping not found"}
 
-    tmp_video = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-    tmp_thumb = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg").name
-
-    try:
-        async with httpx.AsyncClient(timeout=300) as client:
-            v_resp = await client.get(video_url)
-            v_resp.raise_for_status()
-            with open(tmp_video, "wb") as f:
-                f.write(v_resp.content)
-
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", tmp_video, "-ss", "00:00:01", "-vframes", "1", tmp_thumb],
-            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-
-        # ✅ 원본 업로드 (variant=None 사용)
-        upload_video(user_id, task_id, tmp_video)
-        upload_thumbnail(user_id, task_id, tmp_thumb)
-
-        await insert_final_video(
-            video_key=task_id,
-            user_id=user_id,
-            title=prompt[:50],
-            description=prompt
-        )
-
-        # ✅ Worker에게 작업 전달 (v1, v2 생성을 위해)
-        job_payload = {
-            "input_key": f"{user_id}/{task_id}.mp4",
-            "output_key": f"{user_id}/{task_id}_processed.mp4",
-        }
-        redis_client.lpush(REDIS_QUEUE, json.dumps(job_payload))
-
-        await insert_operation_log(
-            user_id=user_id,
-            log_type="VIDEO_GENERATE",
-            status="SUCCESS",
-            video_key=task_id,
-            message="Callback processed successfully"
-        )
-
-        redis_client.set(f"task_status:{task_id}", "COMPLETED", ex=86400)
-
-    except Exception as e:
-        print(f"Callback processing error: {e}")
-        redis_client.set(f"task_status:{task_id}", "FAILED", ex=86400)
-        try:
-            await insert_operation_log(
-                user_id=user_id,
-                log_type="VIDEO_GENERATE",
-                status="FAILED",
-                video_key=task_id,
-                message=str(e)
-            )
-        except Exception:
-            pass
-    finally:
-        if os.path.exists(tmp_video): os.remove(tmp_video)
-        if os.path.exists(tmp_thumb): os.remove(tmp_thumb)
+    await update_task(task_id, status="PROCESSING")
+
+    # ✅ 무거운 후처리(다운로드/썸네일/S3/DB/Worker 큐)는 ingest 파이프라인에서 수행하고
+    #    콜백은 등록만 한 뒤 즉시 응답 (KIE 재시도/타임아웃 방지)
+    queued = enqueue_ingest(
+        task_id=task_id,
+        user_id=user_id,
+        video_url=video_url,
+        prompt=prompt,
+        source="video",
+        log_type="VIDEO_GENERATE",
+    )
+    if not queued:
+        # 큐가 가득 찬 경우 KIE가 다시 보내도록 5xx 응답
+        await update_task(task_id, status="QUEUED")
+        raise HTTPException(503, "Ingest queue is full")
 
     return {"code": 200, "msg": "success"}
 
@@ -193,30 +169,80 @@ async def video_callback(request: Request):
 # 3. 내 비디오 목록
 # ==============================
 @router.get("/list")
-def get_my_videos(token_payload: dict = Depends(verify_jwt)):
+async def get_my_videos(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(VIDEO_LIST_DEFAULT_LIMIT, ge=1, le=VIDEO_LIST_MAX_LIMIT),
+    token_payload: dict = Depends(verify_jwt),
+):
     user_id = token_payload["sub"]
-    # ✅ s3_client의 list_user_videos 호출 (중복 제거 없는 개별 노출 방식)
-    videos = list_user_videos(user_id)
-    return {"videos": videos}
+    # ✅ Redis 인덱스에서 페이지 단위 조회 (S3 ListObjects 호출 없음)
+    return await list_videos_page(user_id, cursor, limit)
 
 # ==============================
 # 4. 스트리밍 및 썸네일
 # ==============================
 @router.get("/stream/{task_id}")
-def stream_video(task_id: str, variant: Optional[str] = Query(None), token_payload: dict = Depends(verify_jwt)):
+async def stream_video(
+    task_id: str,
+    variant: Optional[str] = Query(None),
+    delivery: Optional[str] = Query(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    token_payload: dict = Depends(verify_jwt),
+):
     user_id = token_payload["sub"]
-    try:
-        # ✅ variant 파라미터 전달 (v1, v2 등)
-        file_stream = get_video_stream(user_id, task_id, variant=variant)
-        return StreamingResponse(file_stream, media_type="video/mp4")
-    except Exception:
-        raise HTTPException(404, "Video not found")
+    mode = resolve_delivery_mode(delivery)
+    if mode != "proxy":
+        # ✅ WAS를 거치지 않고 S3에서 직접 받도록 presigned URL 전달
+        return await presigned_response(
+            video_object_key(user_id, task_id, variant), "video/mp4", mode, "Video not found"
+        )
+
+    # ✅ Range 헤더가 있으면 206 Partial Content로 응답 (탐색/미리보기용)
+    return await video_response(user_id, task_id, variant, range_header)
+
+@router.get("/hls/{task_id}/{variant}/url")
+async def hls_master_url(task_id: str, variant: str, request: Request, token_payload: dict = Depends(verify_jwt)):
+    # ✅ 플레이어(네이티브 포함)는 헤더를 못 붙이므로 서명된 master 주소를 발급
+    master_path = request.url.path.rsplit("/", 1)[0] + "/master.m3u8"
+    return master_playlist_url(token_payload["sub"], task_id, variant, master_path)
+
+@router.get("/hls/{task_id}/{variant}/master.m3u8")
+async def hls_master_playlist(
+    task_id: str,
+    variant: str,
+    uid: str = Query(...),
+    exp: int = Query(...),
+    sig: str = Query(...),
+):
+    # ✅ 첫 세그먼트만 받으면 재생 시작 (단계별 URI에도 서명이 붙어 헤더 없이 재생 가능)
+    return await master_playlist_response(task_id, variant, uid, exp, sig)
+
+@router.get("/hls/{task_id}/{variant}/{rendition}/index.m3u8")
+async def hls_media_playlist(
+    task_id: str,
+    variant: str,
+    rendition: str,
+    uid: str = Query(...),
+    exp: int = Query(...),
+    sig: str = Query(...),
+):
+    return await media_playlist_response(task_id, variant, rendition, uid, exp, sig)
 
 @router.get("/thumbnail/{task_id}")
-def stream_thumbnail(task_id: str, token_payload: dict = Depends(verify_jwt)):
+async def stream_thumbnail(
+    task_id: str,
+    delivery: Optional[str] = Query(None),
+    token_payload: dict = Depends(verify_jwt),
+):
     user_id = token_payload["sub"]
+    mode = resolve_delivery_mode(delivery)
+    if mode != "proxy":
+        return await presigned_response(
+            thumbnail_object_key(user_id, task_id), "image/jpeg", mode, "Thumbnail not found"
+        )
+
     try:
-        file_stream = get_thumbnail_stream(user_id, task_id)
+        file_stream = await asyncio.to_thread(get_thumbnail_stream, user_id, task_id)
         return StreamingResponse(file_stream, media_type="image/jpeg")
     except Exception:
         raise HTTPException(404, "Thumbnail not found")
@@ -224,43 +250,17 @@ def stream_thumbnail(task_id: str, token_payload: dict = Depends(verify_jwt)):
 # ==============================
 # 5. 유튜브 업로드
 # ==============================
-@router.post("/youtube/upload")
+@router.post("/youtube/upload", status_code=202)
 async def upload_to_youtube_api(body: YoutubeUploadRequest, token_payload: dict = Depends(verify_jwt)):
-    user_id = token_payload["sub"]
-    task_id = body.video_key
-    tmp_video = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-    try:
-        # ✅ 사용자가 요청한 variant를 우선적으로 가져오기 시도
-        try:
-            stream = get_video_stream(user_id, task_id, variant=body.variant)
-        except Exception:
-            # 실패 시 원본 시도
-            stream = get_video_stream(user_id, task_id, variant=None)
-
-        with open(tmp_video, "wb") as f:
-            f.write(stream.read())
-
-        youtube = get_youtube_service(user_id)
-        request = youtube.videos().insert(
-            part="snippet,status",
-            body={
-                "snippet": {
-                    "title": body.title,
-                    "description": body.description or f"Task: {task_id}",
-                    "categoryId": "22"
-                },
-                "status": {"privacyStatus": "private"},
-            },
-            media_body=MediaFileUpload(tmp_video, mimetype="video/mp4", resumable=True),
-        )
-        response = request.execute()
-        youtube_id = response.get("id")
-        if youtube_id:
-            await mark_youtube_uploaded(video_key=task_id, youtube_video_id=youtube_id)
-
-        return {"status": "UPLOADED", "youtube_video_id": youtube_id}
-    except Exception as e:
-        raise HTTPException(500, f"YouTube upload failed: {e}")
-    finally:
-        if os.path.exists(tmp_video):
-            os.remove(tmp_video)
\ No newline at end of file
+    # ✅ 업로드는 백그라운드 작업으로 등록하고 job_id만 즉시 반환
+    return await submit_upload(
+        user_id=token_payload["sub"],
+        task_id=body.video_key,
+        variant=body.variant,
+        title=body.title,
+        description=body.description,
+    )
+
+@router.get("/youtube/jobs/{job_id}")
+async def youtube_upload_status(job_id: str, token_payload: dict = Depends(verify_jwt)):
+    return await job_status(job_id, token_payload["sub"])
@@ -0,0 +1,95 @@
+# app/video_index.py
+import time
+import asyncio
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from app.db import redis_client
+from app.s3_client import list_user_video_entries
+
+# ======================================================
+# 유저별 영상 인덱스
+#   user_videos:{user_id}  (sorted set, member=task_id, score=생성 시각)
+#   업로드 시 ZADD, 목록 조회는 score 기반 cursor(ZREVRANGEBYSCORE)로 페이지 단위 응답.
+#   기존 유저는 첫 조회 때 S3 목록으로 한 번만 backfill 합니다.
+# ======================================================
+
+
+def user_videos_key(user_id: str) -> str:
+    return f"user_videos:{user_id}"
+
+
+def user_videos_indexed_key(user_id: str) -> str:
+    return f"user_videos_indexed:{user_id}"
+
+
+async def add_video(user_id: str, task_id: str, created_at: Optional[float] = None):
+    # NX: 재처리(콜백 재시도 등)로 정렬 순서가 바뀌지 않도록 최초 시각 유지
+    await redis_client.zadd(
+        user_videos_key(user_id),
+        {task_id: created_at or time.time()},
+        nx=True,
+    )
+
+
+async def _ensure_backfilled(user_id: str):
+    if await redis_client.exists(user_videos_indexed_key(user_id)):
+        return
+
+    try:
+        entries = await asyncio.to_thread(list_user_video_entries, user_id)
+    except ClientError as e:
+        print(f"❌ [video_index] S3 backfill failed for {user_id}: {e}")
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    if entries:
+        pipe.zadd(user_videos_key(user_id), entries, nx=True)
+    pipe.set(user_videos_indexed_key(user_id), "1")
+    await pipe.execute()
+    print(f"📚 [video_index] Backfilled {len(entries)} video(s) for {user_id}")
+
+
+def _encode_cursor(score: float, member: str) -> str:
+    return f"{score!r}:{member}"
+
+
+def _decode_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    score, _, member = cursor.partition(":")
+    try:
+        return float(score), member
+    except ValueError:
+        return None
+
+
+async def list_videos_page(user_id: str, cursor: Optional[str], limit: int) -> dict:
+    """
+    최신순 페이지를 반환합니다.
+    cursor는 이전 페이지 마지막 항목의 "score:task_id"이며, 마지막 페이지면 next_cursor=None.
+    (offset이 아니므로 페이지 사이에 영상이 추가돼도 중복/누락이 없음)
+    """
+    await _ensure_backfilled(user_id)
+    key = user_videos_key(user_id)
+    position = _decode_cursor(cursor)
+
+    # limit + 1개를 읽어 다음 페이지 존재 여부를 판단
+    if position is None:
+        items = await redis_client.zrevrange(key, 0, limit, withscores=True)
+    else:
+        score, member = position
+        pipe = redis_client.pipeline(transaction=False)
+        # 같은 score는 member 역순으로 정렬되므로 cursor보다 작은 member만 이어서 반환
+        pipe.zrevrangebyscore(key, score, score, withscores=True)
+        pipe.zrevrangebyscore(key, f"({score!r}", "-inf", start=0, num=limit + 1, withscores=True)
+        ties, older = await pipe.execute()
+        items = [(m, sc) for m, sc in ties if m < member] + older
+
+    page = items[:limit]
+    has_more = len(items) > limit
+    return {
+        "videos": [member for member, _ in page],
+        "next_cursor": _encode_cursor(page[-1][1], page[-1][0]) if has_more else None,
+    }
@@ -0,0 +1,95 @@
+# app/youtube.py
+import time
+import random
+from typing import Callable, Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+
+from app.config import YOUTUBE_UPLOAD_CHUNK_SIZE, YOUTUBE_UPLOAD_MAX_RETRIES
+from app.s3_client import S3RangeReader, video_object_key
+
+# 재시도해도 되는 응답 (일시적 오류)
+RETRIABLE_STATUS_CODES = (500, 502, 503, 504, 429)
+# S3 구간 읽기에서 재시도할 오류 코드 (그 외 AccessDenied / NoSuchKey / InvalidRange 등은 즉시 실패)
+RETRIABLE_S3_ERROR_CODES = ("SlowDown", "InternalError", "ServiceUnavailable", "RequestTimeout", "Throttling")
+
+
+def _open_source(user_id: str, task_id: str, variant: Optional[str]) -> S3RangeReader:
+    # ✅ 사용자가 요청한 variant를 우선적으로 가져오기 시도
+    try:
+        return S3RangeReader(video_object_key(user_id, task_id, variant))
+    except ClientError:
+        # 실패 시 원본 시도
+        return S3RangeReader(video_object_key(user_id, task_id, None))
+
+
+def _is_retriable(e: Exception) -> bool:
+    if isinstance(e, HttpError):
+        return e.resp.status in RETRIABLE_STATUS_CODES
+    if isinstance(e, ClientError):
+        error = e.response.get("Error", {})
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return error.get("Code") in RETRIABLE_S3_ERROR_CODES or status >= 500
+    # 네트워크 오류
+    return isinstance(e, (OSError, BotoCoreError))
+
+
+# ======================================================
+# YouTube 업로드 (SYNC - 반드시 스레드에서 실행)
+#   S3 구간 읽기 → resumable 업로드 청크를 그대로 이어 붙이므로
+#   임시 파일 없이 메모리는 청크 하나 크기로 유지됩니다.
+#   youtube_jobs의 전용 스레드 풀에서 호출합니다.
+# ======================================================
+def upload_video_to_youtube(
+    *,
+    youtube,
+    user_id: str,
+    task_id: str,
+    variant: Optional[str],
+    title: str,
+    description: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Optional[str]:
+    """
+    youtube: google_auth.youtube_service()로 빌린 service 객체
+    on_progress(uploaded_bytes, total_bytes) 는 청크가 끝날 때마다 호출됩니다.
+    """
+    source = _open_source(user_id, task_id, variant)
+
+    request = youtube.videos().insert(
+        part="snippet,status",
+        body={
+            "snippet": {
+                "title": title,
+                "description": description or f"Task: {task_id}",
+                "categoryId": "22"
+            },
+            "status": {"privacyStatus": "private"},
+        },
+        media_body=MediaIoBaseUpload(
+            source, mimetype="video/mp4", chunksize=YOUTUBE_UPLOAD_CHUNK_SIZE, resumable=True
+        ),
+    )
+
+    response = None
+    retries = 0
+    while response is None:
+        try:
+            status, response = request.next_chunk()
+            retries = 0
+            if status and on_progress:
+                on_progress(status.resumable_progress, source.size)
+        except Exception as e:
+            if not _is_retriable(e) or retries >= YOUTUBE_UPLOAD_MAX_RETRIES:
+                raise
+            retries += 1
+            # 다음 next_chunk()가 업로드된 위치를 다시 확인하고 이어서 전송
+            delay = min(2 ** retries, 32) + random.random()
+            print(f"⚠️ YouTube upload chunk failed ({e}), retry {retries}/{YOUTUBE_UPLOAD_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+
+    if on_progress:
+        on_progress(source.size, source.size)
+    return response.get("id")
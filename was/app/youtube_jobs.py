@@ -0,0 +1,219 @@
+# app/youtube_jobs.py
+import time
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.config import (
+    YOUTUBE_UPLOAD_CONCURRENCY,
+    YOUTUBE_UPLOAD_PER_USER,
+    YOUTUBE_UPLOAD_MAX_PENDING_PER_USER,
+    YOUTUBE_JOB_TTL_SECONDS,
+    YOUTUBE_JOB_STALE_SECONDS,
+)
+from app.db import redis_client
+from app.ai import mark_youtube_uploaded
+from app.youtube import upload_video_to_youtube
+from app.google_auth import youtube_service
+
+# ======================================================
+# YouTube 업로드 작업
+#   POST → youtube_job:{job_id} hash 생성 후 즉시 job_id 반환
+#   백그라운드 태스크가 전용 스레드 풀에서 청크 업로드를 수행하며
+#   진행률을 hash에 기록 (클라이언트는 GET으로 조회)
+#
+#   상태: QUEUED → UPLOADING → UPLOADED / FAILED
+#   실행 중인 작업은 heartbeat로 updated_at을 갱신하므로, QUEUED/UPLOADING이
+#   YOUTUBE_JOB_STALE_SECONDS 동안 갱신되지 않으면 (WAS가 비정상 종료되어 남은 작업)
+#   조회 시 FAILED로 응답
+# ======================================================
+JOB_FIELDS = (
+    "user_id", "task_id", "variant", "status", "progress",
+    "uploaded_bytes", "total_bytes", "youtube_video_id", "error", "updated_at",
+)
+ACTIVE_STATUSES = ("QUEUED", "UPLOADING")
+
+# 진행률은 이 간격(%) 이상 변할 때만 기록
+PROGRESS_STEP = 5
+
+# 업로드는 몇 분씩 스레드를 점유하므로 기본 to_thread 풀과 분리
+_executor: Optional[ThreadPoolExecutor] = None
+_global_slots: Optional[asyncio.Semaphore] = None
+_user_slots: dict = {}
+_pending: dict = {}  # user_id -> 대기+진행 중 작업 수
+_tasks: set = set()
+
+
+def job_key(job_id: str) -> str:
+    return f"youtube_job:{job_id}"
+
+
+async def _update_job(job_id: str, **fields):
+    mapping = {k: v for k, v in fields.items() if v is not None}
+    mapping["updated_at"] = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(job_key(job_id), mapping=mapping)
+    pipe.expire(job_key(job_id), YOUTUBE_JOB_TTL_SECONDS)
+    await pipe.execute()
+
+
+async def _heartbeat(job_id: str):
+    """대기/업로드 중에도 updated_at을 갱신 → 살아 있는 작업은 stale로 보이지 않음"""
+    while True:
+        await asyncio.sleep(max(YOUTUBE_JOB_STALE_SECONDS // 3, 1))
+        try:
+            await redis_client.hset(job_key(job_id), "updated_at", time.time())
+        except Exception as e:
+            print(f"⚠️ [youtube] heartbeat failed for {job_id}: {e}")
+
+
+async def get_job(job_id: str) -> dict:
+    values = await redis_client.hmget(job_key(job_id), JOB_FIELDS)
+    return dict(zip(JOB_FIELDS, values))
+
+
+def _is_stale(job: dict) -> bool:
+    if job.get("status") not in ACTIVE_STATUSES or not job.get("updated_at"):
+        return False
+    return time.time() - float(job["updated_at"]) > YOUTUBE_JOB_STALE_SECONDS
+
+
+def public_job(job_id: str, job: dict) -> dict:
+    if _is_stale(job):
+        job = {**job, "status": "FAILED", "error": "Upload job stalled"}
+    body = {
+        "job_id": job_id,
+        "task_id": job.get("task_id"),
+        "variant": job.get("variant"),
+        "status": job.get("status") or "UNKNOWN",
+        "progress": int(job.get("progress") or 0),
+    }
+    for field in ("uploaded_bytes", "total_bytes"):
+        if job.get(field) is not None:
+            body[field] = int(job[field])
+    if job.get("youtube_video_id"):
+        body["youtube_video_id"] = job["youtube_video_id"]
+    if job.get("error"):
+        body["error"] = job["error"]
+    return body
+
+
+async def job_status(job_id: str, user_id: str) -> dict:
+    job = await get_job(job_id)
+    if not job.get("user_id"):
+        raise HTTPException(404, "Upload job not found")
+    if job["user_id"] != user_id:
+        raise HTTPException(403, "Forbidden")
+    return public_job(job_id, job)
+
+
+# ======================================================
+# 실행
+# ======================================================
+async def _run_upload(job_id: str, user_id: str, task_id: str, variant: Optional[str], title: str, description: Optional[str]):
+    loop = asyncio.get_running_loop()
+    last_progress = -PROGRESS_STEP
+
+    def on_progress(uploaded: int, total: int):
+        # 업로드 스레드에서 호출 → 이벤트 루프로 넘겨 기록
+        nonlocal last_progress
+        progress = int(uploaded * 100 / total) if total else 100
+        if progress - last_progress < PROGRESS_STEP and progress < 100:
+            return
+        last_progress = progress
+        asyncio.run_coroutine_threadsafe(
+            _update_job(job_id, progress=progress, uploaded_bytes=uploaded, total_bytes=total), loop
+        )
+
+    user_slots = _user_slots.setdefault(user_id, asyncio.Semaphore(YOUTUBE_UPLOAD_PER_USER))
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        # 유저 슬롯을 먼저 잡아야 같은 유저의 대기 작업이 전역 슬롯을 점유하지 않음
+        async with user_slots, _global_slots:
+            await _update_job(job_id, status="UPLOADING", started_at=time.time())
+            async with youtube_service(user_id) as youtube:
+                youtube_id = await loop.run_in_executor(
+                    _executor,
+                    lambda: upload_video_to_youtube(
+                        youtube=youtube,
+                        user_id=user_id,
+                        task_id=task_id,
+                        variant=variant,
+                        title=title,
+                        description=description,
+                        on_progress=on_progress,
+                    ),
+                )
+        if youtube_id:
+            await mark_youtube_uploaded(video_key=task_id, youtube_video_id=youtube_id)
+        await _update_job(
+            job_id, status="UPLOADED", progress=100, youtube_video_id=youtube_id, completed_at=time.time()
+        )
+    except asyncio.CancelledError:
+        await _update_job(job_id, status="FAILED", error="Server shutting down")
+        raise
+    except Exception as e:
+        print(f"❌ [youtube] upload job {job_id} failed: {e}")
+        await _update_job(job_id, status="FAILED", error=str(e)[:500])
+    finally:
+        heartbeat.cancel()
+        _pending[user_id] -= 1
+        if _pending[user_id] <= 0:
+            _pending.pop(user_id, None)
+            _user_slots.pop(user_id, None)
+
+
+async def submit_upload(
+    *,
+    user_id: str,
+    task_id: str,
+    variant: Optional[str],
+    title: str,
+    description: Optional[str] = None,
+) -> dict:
+    """업로드 작업을 등록하고 바로 반환합니다. (유저당 대기 작업이 너무 많으면 429)"""
+    if _executor is None:
+        raise HTTPException(503, "Upload workers are not running")
+    if _pending.get(user_id, 0) >= YOUTUBE_UPLOAD_MAX_PENDING_PER_USER:
+        raise HTTPException(429, "Too many YouTube uploads in progress")
+
+    job_id = uuid.uuid4().hex
+    await _update_job(
+        job_id,
+        user_id=user_id,
+        task_id=task_id,
+        variant=variant,
+        status="QUEUED",
+        progress=0,
+        created_at=time.time(),
+    )
+
+    _pending[user_id] = _pending.get(user_id, 0) + 1
+    task = asyncio.create_task(_run_upload(job_id, user_id, task_id, variant, title, description))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return {"job_id": job_id, "status": "QUEUED"}
+
+
+async def start_youtube_workers():
+    global _executor, _global_slots
+    if _executor is not None:
+        return
+    _executor = ThreadPoolExecutor(max_workers=YOUTUBE_UPLOAD_CONCURRENCY, thread_name_prefix="youtube-upload")
+    _global_slots = asyncio.Semaphore(YOUTUBE_UPLOAD_CONCURRENCY)
+    print(f"📤 YouTube upload workers started (concurrency={YOUTUBE_UPLOAD_CONCURRENCY}, per_user={YOUTUBE_UPLOAD_PER_USER})")
+
+
+async def stop_youtube_workers():
+    global _executor
+    if _executor is None:
+        return
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    # 이미 시작된 청크 업로드는 취소할 수 없으므로 기다리지 않음
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
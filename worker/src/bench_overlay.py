@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+자막 합성 방식 벤치마크 (draw vs png)
+
+같은 입력/자막으로 두 방식의 filter graph를 libx264로 인코딩해 보고
+(출력은 버림) 인코딩 fps를 비교합니다.
+
+  python3 bench_overlay.py input.mp4 [repeat]
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+
+import render
+
+CAPTIONS = {"v1": "벤치마크 자막", "v2": "두 번째 자막 테스트"}
+
+
+def count_frames(path: str) -> int:
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-count_packets", "-show_entries", "stream=nb_read_packets",
+            "-of", "csv=p=0", path,
+        ],
+        check=True, capture_output=True, text=True,
+    )
+    return int(result.stdout.strip() or 0)
+
+
+def encode_cmd(input_path: str, geometry: dict, mode: str) -> list:
+    """render.build_command와 같은 graph를 쓰되 출력은 null muxer로 버림"""
+    outputs = ["-"] * len(CAPTIONS)
+    if mode == "png":
+        layers = [render.rasterize_overlay(text, geometry) for text in CAPTIONS.values()]
+    else:
+        layers = []
+        for variant, text in CAPTIONS.items():
+            path = f"/tmp/bench_caption_{variant}.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            layers.append(path)
+
+    cmd = render.build_command(input_path, layers, outputs, geometry, overlay=(mode == "png"))
+    # 파일 출력 옵션(-movflags)을 null 출력으로 교체
+    for i, arg in enumerate(cmd):
+        if arg == "-movflags":
+            cmd[i:i + 2] = ["-f", "null"]
+    return cmd
+
+
+def bench(input_path: str, repeat: int = 3) -> dict:
+    media = render.probe(input_path)
+    geometry = render.plan_geometry(media)
+    frames = count_frames(input_path)
+    results = {}
+    for mode in ("draw", "png"):
+        # 워밍업 (PNG 래스터화, 디스크 캐시) - 측정에서 제외
+        subprocess.run(encode_cmd(input_path, geometry, mode), check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = []
+        for _ in range(repeat):
+            started = time.monotonic()
+            subprocess.run(encode_cmd(input_path, geometry, mode), check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elapsed.append(time.monotonic() - started)
+        best = min(elapsed)
+        results[mode] = {
+            "best_seconds": round(best, 3),
+            # variant 수만큼 인코딩하므로 출력 기준 fps
+            "encode_fps": round(frames * len(CAPTIONS) / best, 1) if best else None,
+        }
+    results["geometry"] = f"{geometry['width']}x{geometry['height']}"
+    results["frames"] = frames
+    return results
+
+
+def main():
+    if len(sys.argv) < 2 or not os.path.exists(sys.argv[1]):
+        print("Usage: bench_overlay.py <input.mp4> [repeat]")
+        sys.exit(2)
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(json.dumps(bench(sys.argv[1], repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
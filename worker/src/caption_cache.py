@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+자막 캐시 (perceptual hash 기반)
+
+비슷한 프롬프트로 만든 영상은 첫 프레임도 거의 같으므로,
+프레임의 dHash(64bit)가 가까우면 이전에 만든 자막을 그대로 재사용합니다.
+
+  caption_cache:{model}:{variant}:{prompt_sha}        hash  field=dHash(hex) → {"caption", "ts"}
+  caption_cache:{model}:{variant}:{prompt_sha}:lru    zset  member=dHash(hex), score=저장 시각
+  caption_cache:stats                                  hash  hits / misses (variant 단위)
+
+- TTL      : CAPTION_CACHE_TTL_SECONDS 가 지난 항목은 무시/삭제
+- 크기 제한: variant별 CAPTION_CACHE_MAX_ENTRIES 를 넘으면 오래된 것부터 삭제
+- 유사도   : 해밍 거리 CAPTION_CACHE_MAX_DISTANCE 이하면 hit (0이면 완전 일치만)
+"""
+import os
+import json
+import time
+import hashlib
+import subprocess
+
+import redis
+
+CAPTION_CACHE_ENABLED = os.getenv("CAPTION_CACHE_ENABLED", "true").lower() == "true"
+CAPTION_CACHE_TTL_SECONDS = int(os.getenv("CAPTION_CACHE_TTL_SECONDS", str(7 * 86400)))
+CAPTION_CACHE_MAX_ENTRIES = int(os.getenv("CAPTION_CACHE_MAX_ENTRIES", "5000"))
+CAPTION_CACHE_MAX_DISTANCE = int(os.getenv("CAPTION_CACHE_MAX_DISTANCE", "4"))
+
+STATS_KEY = "caption_cache:stats"
+
+
+def frame_dhash(video: str, at: str = "00:00:01"):
+    """
+    자막 생성에 쓰는 것과 같은 시점의 프레임으로 64bit dHash를 계산합니다.
+    9x8 grayscale 로 줄인 뒤 가로로 이웃한 픽셀의 밝기 비교 결과를 비트로 씁니다.
+    실패 시 None.
+    """
+    try:
+        raw = subprocess.run(
+            [
+                "ffmpeg", "-v", "error",
+                "-ss", at,
+                "-i", str(video),
+                "-vf", "scale=9:8,format=gray",
+                "-frames:v", "1",
+                "-f", "rawvideo", "pipe:1",
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=60,
+        ).stdout
+    except (subprocess.SubprocessError, OSError):
+        return None
+    if len(raw) < 72:
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = raw[row * 9 + col]
+            right = raw[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class CaptionCache:
+    def __init__(self, client: redis.Redis, model: str, prompts: dict):
+        self.r = client
+        self.model = model
+        # 프롬프트 문구가 바뀌면 자동으로 다른 캐시를 쓰도록 키에 해시 포함
+        self.prompt_sha = {
+            variant: hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+            for variant, prompt in prompts.items()
+        }
+
+    def frame_hash(self, video: str):
+        return frame_dhash(video)
+
+    def _key(self, variant: str) -> str:
+        return f"caption_cache:{self.model}:{variant}:{self.prompt_sha[variant]}"
+
+    def lookup(self, phash: int, variants) -> dict:
+        """hit 난 variant만 {variant: caption} 으로 반환합니다."""
+        hits = {}
+        now = time.time()
+        field = f"{phash:016x}"
+
+        for variant in variants:
+            key = self._key(variant)
+            entry = self.r.hget(key, field)
+            if entry is None and CAPTION_CACHE_MAX_DISTANCE > 0:
+                entry = self._nearest(key, phash, now)
+            if entry is not None:
+                data = json.loads(entry)
+                if now - data["ts"] <= CAPTION_CACHE_TTL_SECONDS:
+                    hits[variant] = data["caption"]
+
+        misses = len(list(variants)) - len(hits)
+        pipe = self.r.pipeline(transaction=False)
+        if hits:
+            pipe.hincrby(STATS_KEY, "hits", len(hits))
+        if misses:
+            pipe.hincrby(STATS_KEY, "misses", misses)
+        pipe.execute()
+        return hits
+
+    def _nearest(self, key: str, phash: int, now: float):
+        """해밍 거리가 가장 가까운 (유효한) 항목을 찾습니다. 크기 제한이 있으므로 전체 스캔."""
+        best, best_distance = None, CAPTION_CACHE_MAX_DISTANCE + 1
+        for field, entry in self.r.hgetall(key).items():
+            distance = hamming(phash, int(field, 16))
+            if distance < best_distance and now - json.loads(entry)["ts"] <= CAPTION_CACHE_TTL_SECONDS:
+                best, best_distance = entry, distance
+        return best
+
+    def store(self, phash: int, captions: dict):
+        now = time.time()
+        field = f"{phash:016x}"
+        pipe = self.r.pipeline(transaction=False)
+        for variant, caption in captions.items():
+            key = self._key(variant)
+            pipe.hset(key, field, json.dumps({"caption": caption, "ts": now}, ensure_ascii=False))
+            pipe.zadd(f"{key}:lru", {field: now})
+            pipe.expire(key, CAPTION_CACHE_TTL_SECONDS)
+            pipe.expire(f"{key}:lru", CAPTION_CACHE_TTL_SECONDS)
+        pipe.execute()
+
+        for variant in captions:
+            self._trim(self._key(variant), now)
+
+    def _trim(self, key: str, now: float):
+        lru = f"{key}:lru"
+        expired = self.r.zrangebyscore(lru, 0, now - CAPTION_CACHE_TTL_SECONDS)
+        excess = self.r.zcard(lru) - len(expired) - CAPTION_CACHE_MAX_ENTRIES
+        if excess > 0:
+            expired += self.r.zrange(lru, len(expired), len(expired) + excess - 1)
+        if expired:
+            pipe = self.r.pipeline(transaction=False)
+            pipe.hdel(key, *expired)
+            pipe.zrem(lru, *expired)
+            pipe.execute()
+
+
+def cache_stats(client: redis.Redis) -> dict:
+    stats = client.hgetall(STATS_KEY)
+    hits, misses = int(stats.get("hits", 0)), int(stats.get("misses", 0))
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 3) if total else 0.0}
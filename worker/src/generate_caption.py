@@ -6,14 +6,20 @@ import tempfile
 import os
 import json
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 MODEL = "qwen2.5vl"
 # 환경변수에서 호스트 주소를 받아옴 (Hybrid 모드 핵심)
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
-OLLAMA_URL = f"{OLLAMA_HOST}/api/chat"
 
 DEFAULT_TEXT = "편집된 영상"
 
+# 자막 생성 방식
+# - parallel : variant별 요청을 동시에 전송 (기본)
+# - combined : 한 번의 요청으로 모든 variant를 JSON으로 받음 (실패 시 parallel로 fallback)
+CAPTION_MODE = os.getenv("CAPTION_MODE", "parallel")
+
 PROMPTS = {
     "v1": (
         "이 이미지를 보고 "
@@ -30,8 +36,25 @@ PROMPTS = {
     ),
 }
 
+# 프로세스당 하나의 세션을 재사용 (Ollama 연결 keep-alive)
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+def _post_chat(host: str, payload: dict, timeout) -> str:
+    r = _session.post(f"{host}/api/chat", json=payload, timeout=timeout)
+    r.raise_for_status()
+    return (r.json().get("message", {}).get("content") or "").strip()
+
+def _is_backend_failure(e: requests.exceptions.RequestException) -> bool:
+    """다른 호스트로 넘겨볼 만한 실패인지 (연결/타임아웃/5xx)."""
+    if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(e, "response", None)
+    return response is not None and response.status_code >= 500
+
 # 1. 특정 프롬프트를 매개변수로 받도록 수정됨
-def ollama_chat(image_b64: str, prompt_text: str, timeout=120) -> str:
+def ollama_chat(image_b64: str, prompt_text: str, timeout=120, host: str = None, fmt: str = None, pool=None) -> str:
     payload = {
         "model": MODEL,
         "messages": [
@@ -43,14 +66,30 @@ def ollama_chat(image_b64: str, prompt_text: str, timeout=120) -> str:
         ],
         "stream": False,
     }
-
-    try:
-        r = requests.post(OLLAMA_URL, json=payload, timeout=timeout)
-        r.raise_for_status()
-        return (r.json().get("message", {}).get("content") or "").strip()
-    except requests.exceptions.RequestException as e:
-        sys.stderr.write(f"Ollama Request Error: {e}\n")
-        return ""
+    if fmt:
+        payload["format"] = fmt
+
+    if pool is None:
+        try:
+            return _post_chat(host or OLLAMA_HOST, payload, timeout)
+        except requests.exceptions.RequestException as e:
+            sys.stderr.write(f"Ollama Request Error: {e}\n")
+            return ""
+
+    # 풀 사용 시: 실패한 호스트는 제외하고 다른 호스트로 재시도 (failover)
+    tried = set()
+    while True:
+        with pool.acquire(exclude=tried) as backend:
+            if backend is None:
+                return ""
+            tried.add(backend)
+            try:
+                return _post_chat(backend, payload, timeout)
+            except requests.exceptions.RequestException as e:
+                sys.stderr.write(f"Ollama Request Error ({backend}): {e}\n")
+                if not _is_backend_failure(e):
+                    return ""
+                pool.mark_down(backend)
 
 # 2. 불필요한 특수문자 제거 로직
 def sanitize(text: str) -> str:
@@ -58,20 +97,11 @@ def sanitize(text: str) -> str:
         text = text.replace(c, "")
     return text.strip()
 
-def main():
-    # 예외 발생 시 반환할 기본 JSON 구조
-    default_json = json.dumps({"v1": DEFAULT_TEXT, "v2": DEFAULT_TEXT}, ensure_ascii=False)
-
-    if len(sys.argv) != 2:
-        print(default_json)
-        return
+def default_captions() -> dict:
+    return {variant: DEFAULT_TEXT for variant in PROMPTS}
 
-    video = Path(sys.argv[1])
-    if not video.exists():
-        print(default_json)
-        return
-
-    # 3. 썸네일 프레임 추출
+# 3. 썸네일 프레임 추출 (base64 JPEG)
+def extract_frame_b64(video: str) -> str:
     fd, frame_path = tempfile.mkstemp(suffix=".jpg")
     os.close(fd)
     frame = Path(frame_path)
@@ -91,26 +121,102 @@ def main():
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
+        return base64.b64encode(frame.read_bytes()).decode()
+    finally:
+        # 임시 프레임 이미지 삭제
+        frame.unlink(missing_ok=True)
 
-        img_b64 = base64.b64encode(frame.read_bytes()).decode()
-        
-        # 4. v1, v2 프롬프트를 각각 순회하며 자막 생성
-        captions = {}
-        for variant, prompt in PROMPTS.items():
-            result = sanitize(ollama_chat(img_b64, prompt))
-            # 결과가 비어있으면 기본 텍스트 삽입
-            captions[variant] = result if result else DEFAULT_TEXT
-
-        # 5. JSON 형식으로 콘솔에 출력 (worker.py가 이 문자열을 읽음)
-        print(json.dumps(captions, ensure_ascii=False))
+# 4. variant별 자막 생성
+def captions_parallel(img_b64: str, host: str = None, variants=None, pool=None) -> dict:
+    """variant별 프롬프트를 동시에 보내 가장 느린 요청 시간만큼만 기다립니다."""
+    variants = list(variants or PROMPTS)
+    with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+        futures = {
+            variant: executor.submit(ollama_chat, img_b64, PROMPTS[variant], host=host, pool=pool)
+            for variant in variants
+        }
+        # 결과가 비어있으면 기본 텍스트 삽입
+        return {
+            variant: sanitize(future.result()) or DEFAULT_TEXT
+            for variant, future in futures.items()
+        }
+
+def combined_prompt() -> str:
+    lines = [
+        "이 이미지를 보고 아래 각 항목의 지시에 맞는 제목을 하나씩 만들어라.",
+        f"반드시 {', '.join(PROMPTS)} 키만 가진 JSON 객체로만 답하라.",
+    ]
+    for variant, prompt in PROMPTS.items():
+        lines.append(f"- {variant}: {prompt.replace('이 이미지를 보고 ', '')}")
+    return "\n".join(lines)
+
+def captions_combined(img_b64: str, host: str = None, pool=None):
+    """한 번의 추론으로 모든 variant를 받습니다. 형식이 맞지 않으면 None."""
+    raw = ollama_chat(img_b64, combined_prompt(), host=host, fmt="json", pool=pool)
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict) or not all(isinstance(parsed.get(v), str) for v in PROMPTS):
+        return None
+    return {variant: sanitize(parsed[variant]) or DEFAULT_TEXT for variant in PROMPTS}
+
+# 5. 자막 생성 API (worker.py에서 직접 import 해서 사용)
+def generate_captions(video: str, host: str = None, cache=None, pool=None) -> dict:
+    """
+    영상 첫 프레임을 보고 variant별 자막을 만듭니다.
+    cache(caption_cache.CaptionCache)가 있으면 비슷한 프레임의 자막을 재사용하고
+    없는 variant만 Ollama에 요청합니다.
+    pool(ollama_pool.OllamaPool)이 있으면 host 대신 풀에서 호스트를 고릅니다.
+    실패 시에도 예외 대신 기본 자막 dict를 반환합니다.
+    """
+    try:
+        phash, cached = None, {}
+        if cache is not None:
+            try:
+                phash = cache.frame_hash(video)
+                if phash is not None:
+                    cached = cache.lookup(phash, PROMPTS)
+            except Exception as e:
+                # 캐시 장애는 캡션 생성을 막지 않음
+                sys.stderr.write(f"Caption cache lookup failed: {e}\n")
+                phash = None
+        missing = [variant for variant in PROMPTS if variant not in cached]
+        if not missing:
+            return cached
+
+        img_b64 = extract_frame_b64(video)
+
+        generated = None
+        if CAPTION_MODE == "combined" and len(missing) == len(PROMPTS):
+            generated = captions_combined(img_b64, host=host, pool=pool)
+            if not generated:
+                sys.stderr.write("Combined caption response invalid. Falling back to parallel.\n")
+        if not generated:
+            generated = captions_parallel(img_b64, host=host, variants=missing, pool=pool)
+
+        # 기본 문구(생성 실패)는 캐시하지 않음
+        if phash is not None:
+            fresh = {v: c for v, c in generated.items() if c != DEFAULT_TEXT}
+            if fresh:
+                try:
+                    cache.store(phash, fresh)
+                except Exception as e:
+                    sys.stderr.write(f"Caption cache store failed: {e}\n")
+
+        return {variant: cached.get(variant) or generated[variant] for variant in PROMPTS}
 
     except Exception as e:
         sys.stderr.write(f"Error occurred: {e}\n")
-        print(default_json)
+        return default_captions()
 
-    finally:
-        # 임시 프레임 이미지 삭제
-        frame.unlink(missing_ok=True)
+# CLI: python3 generate_caption.py <video.mp4>  → JSON 한 줄 출력
+def main():
+    if len(sys.argv) != 2 or not Path(sys.argv[1]).exists():
+        print(json.dumps(default_captions(), ensure_ascii=False))
+        return
+
+    print(json.dumps(generate_captions(sys.argv[1]), ensure_ascii=False))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Redis Streams 기반 작업 큐 (ack / 재시도 / dead-letter)
+
+  video_processing_stream          : 작업 스트림 (consumer group = ai-workers)
+  video_processing_stream:delayed  : 재시도 대기 (sorted set, score = 재시도 시각)
+  video_processing_stream:dead     : 최대 시도 횟수를 넘긴 작업 (dead-letter)
+
+- 작업은 XREADGROUP 으로 가져가고, 성공 시에만 XACK 합니다.
+- 워커가 죽으면 ack 되지 않은 메시지가 VISIBILITY_TIMEOUT 이후 XAUTOCLAIM 으로 회수됩니다.
+  (처리 중인 메시지는 supervisor가 주기적으로 XCLAIM 해서 idle 시간을 리셋)
+- 실패 시 지수 backoff 로 delayed 에 넣고, MAX_ATTEMPTS 를 넘기면 dead 로 보냅니다.
+"""
+import os
+import json
+import time
+import socket
+
+import redis
+
+REDIS_STREAM = os.getenv("REDIS_STREAM", "video_processing_stream")
+REDIS_GROUP = os.getenv("REDIS_GROUP", "ai-workers")
+# 이전 방식(LPUSH 리스트)으로 들어온 작업도 스트림으로 옮겨서 처리
+LEGACY_QUEUE = os.getenv("REDIS_QUEUE", "video_processing_jobs")
+
+VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_SECONDS = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))
+
+DELAYED_KEY = f"{REDIS_STREAM}:delayed"
+DEAD_STREAM = f"{REDIS_STREAM}:dead"
+
+
+# 재시도 시각이 지난 작업을 ZREM + XADD 한 번에 옮김 (중간에 워커가 죽어도 유실 없음)
+_PROMOTE_DELAYED_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], 0, ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, member in ipairs(due) do
+    redis.call('ZREM', KEYS[1], member)
+    local entry = cjson.decode(member)
+    redis.call('XADD', KEYS[2], '*', 'job', entry['job'], 'attempt', tostring(entry['attempt']))
+end
+return #due
+"""
+
+
+def default_consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, client: redis.Redis, consumer: str = None, on_dead=None):
+        """on_dead(fields, error): dead-letter로 보낼 때 호출 (작업 상태를 FAILED로 알리는 용도)"""
+        self.r = client
+        self.consumer = consumer or default_consumer_name()
+        self.on_dead = on_dead
+        self._promote = client.register_script(_PROMOTE_DELAYED_LUA)
+
+    # -----------------------------------------------------
+    # 준비 / 유지보수
+    # -----------------------------------------------------
+    def ensure_group(self):
+        try:
+            self.r.xgroup_create(REDIS_STREAM, REDIS_GROUP, id="0", mkstream=True)
+            print(f"🧾 Created consumer group '{REDIS_GROUP}' on '{REDIS_STREAM}'")
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def migrate_legacy(self, limit: int = 100) -> int:
+        """LPUSH 리스트에 남은 작업을 스트림으로 옮깁니다. (배포 중 구버전 WAS 대응)"""
+        moved = 0
+        while moved < limit:
+            raw = self.r.rpop(LEGACY_QUEUE)
+            if raw is None:
+                break
+            self.r.xadd(REDIS_STREAM, {"job": raw, "attempt": 1})
+            moved += 1
+        return moved
+
+    def promote_delayed(self, limit: int = 100) -> int:
+        """재시도 시각이 지난 작업을 스트림으로 되돌립니다. (Lua로 원자적으로 이동)"""
+        return int(self._promote(keys=[DELAYED_KEY, REDIS_STREAM], args=[time.time(), limit]))
+
+    def touch(self, msg_ids):
+        """처리 중인 메시지의 idle 시간을 리셋해 다른 워커가 회수하지 않도록 합니다."""
+        ids = list(msg_ids)
+        if not ids:
+            return
+        self.r.xclaim(REDIS_STREAM, REDIS_GROUP, self.consumer, 0, ids, justid=True)
+
+    # -----------------------------------------------------
+    # 가져오기
+    # -----------------------------------------------------
+    def reclaim(self, count: int) -> list:
+        """VISIBILITY_TIMEOUT 이상 ack 되지 않은 메시지(죽은 워커의 작업)를 회수합니다."""
+        resp = self.r.xautoclaim(
+            REDIS_STREAM,
+            REDIS_GROUP,
+            self.consumer,
+            min_idle_time=VISIBILITY_TIMEOUT_SECONDS * 1000,
+            start_id="0-0",
+            count=count,
+        )
+        messages = [(msg_id, fields) for msg_id, fields in resp[1] if fields]
+        alive = []
+        for msg_id, fields in messages:
+            pending = self.r.xpending_range(REDIS_STREAM, REDIS_GROUP, msg_id, msg_id, 1)
+            delivered = pending[0]["times_delivered"] if pending else 1
+            if delivered > MAX_ATTEMPTS:
+                self.dead_letter(msg_id, fields, f"worker lost the job {delivered - 1} times")
+            else:
+                print(f"♻️  Reclaimed stale job {msg_id} (delivery #{delivered})")
+                alive.append((msg_id, fields))
+        return alive
+
+    def read(self, count: int, block_ms: int = 5000) -> list:
+        resp = self.r.xreadgroup(
+            REDIS_GROUP,
+            self.consumer,
+            {REDIS_STREAM: ">"},
+            count=count,
+            block=block_ms,
+        )
+        if not resp:
+            return []
+        return resp[0][1]
+
+    # -----------------------------------------------------
+    # 결과 처리
+    # -----------------------------------------------------
+    def ack(self, msg_id):
+        pipe = self.r.pipeline()
+        pipe.xack(REDIS_STREAM, REDIS_GROUP, msg_id)
+        pipe.xdel(REDIS_STREAM, msg_id)
+        pipe.execute()
+
+    def fail(self, msg_id, fields: dict, error: str):
+        attempt = int(fields.get("attempt", 1))
+        if attempt >= MAX_ATTEMPTS:
+            self.dead_letter(msg_id, fields, error)
+            return
+
+        delay = RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+        member = json.dumps({"job": fields["job"], "attempt": attempt + 1, "msg_id": msg_id})
+        pipe = self.r.pipeline()
+        pipe.zadd(DELAYED_KEY, {member: time.time() + delay})
+        pipe.xack(REDIS_STREAM, REDIS_GROUP, msg_id)
+        pipe.xdel(REDIS_STREAM, msg_id)
+        pipe.execute()
+        print(f"🔁 Job {msg_id} failed (attempt {attempt}/{MAX_ATTEMPTS}). Retrying in {delay}s: {error}")
+
+    def dead_letter(self, msg_id, fields: dict, error: str):
+        pipe = self.r.pipeline()
+        pipe.xadd(
+            DEAD_STREAM,
+            {
+                "job": fields.get("job", ""),
+                "attempt": fields.get("attempt", 1),
+                "error": error[:1000],
+                "failed_at": time.time(),
+                "source_id": msg_id,
+            },
+        )
+        pipe.xack(REDIS_STREAM, REDIS_GROUP, msg_id)
+        pipe.xdel(REDIS_STREAM, msg_id)
+        pipe.execute()
+        print(f"☠️  Job {msg_id} moved to dead-letter '{DEAD_STREAM}': {error}")
+        if self.on_dead is not None:
+            try:
+                self.on_dead(fields, error)
+            except Exception as e:
+                print(f"⚠️  on_dead callback failed for {msg_id}: {e}")
+
+    # -----------------------------------------------------
+    # dead-letter 조회 / 재등록 (운영용 CLI)
+    # -----------------------------------------------------
+    def list_dead(self, count: int = 20) -> list:
+        return self.r.xrevrange(DEAD_STREAM, count=count)
+
+    def requeue_dead(self, msg_ids=None) -> int:
+        """dead-letter 작업을 attempt=1 로 다시 넣습니다. msg_ids가 없으면 전부."""
+        if msg_ids:
+            entries = []
+            for msg_id in msg_ids:
+                entries += self.r.xrange(DEAD_STREAM, msg_id, msg_id)
+        else:
+            entries = self.r.xrange(DEAD_STREAM)
+
+        for msg_id, fields in entries:
+            pipe = self.r.pipeline()
+            pipe.xadd(REDIS_STREAM, {"job": fields["job"], "attempt": 1})
+            pipe.xdel(DEAD_STREAM, msg_id)
+            pipe.execute()
+        return len(entries)
+
+
+def dlq_cli(client: redis.Redis, args: list):
+    """
+    사용법:
+      python3 worker.py dlq list [N]
+      python3 worker.py dlq requeue <id> [<id> ...]
+      python3 worker.py dlq requeue --all
+    """
+    queue = JobQueue(client)
+    command = args[0] if args else "list"
+
+    if command == "list":
+        count = int(args[1]) if len(args) > 1 else 20
+        entries = queue.list_dead(count)
+        if not entries:
+            print("(dead-letter queue is empty)")
+        for msg_id, fields in entries:
+            print(f"{msg_id}  attempt={fields.get('attempt')}  error={fields.get('error')}")
+            print(f"    job={fields.get('job')}")
+    elif command == "requeue":
+        ids = [a for a in args[1:] if a != "--all"]
+        if not ids and "--all" not in args:
+            print("Specify message ids or --all")
+            return
+        print(f"♻️  Requeued {queue.requeue_dead(ids or None)} job(s)")
+    else:
+        print(dlq_cli.__doc__)
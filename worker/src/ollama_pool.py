@@ -0,0 +1,237 @@
+import os
+import json
+import uuid
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+# =========================================================
+# Ollama 백엔드 풀
+# - 정적 목록(OLLAMA_HOSTS) + 주기적 탐색(discover 콜백) 병합
+# - 헬스 체크(/api/tags)로 죽은 호스트 제외
+# - 진행 중 요청 수가 가장 적은 호스트로 라우팅
+#   (redis_client가 있으면 요청 수를 Redis에 두어 워커 프로세스 전체가 공유:
+#    ollama_inflight:{host} hash에 프로세스별 필드로 기록하고, 프로세스마다
+#    heartbeat 키를 두어 죽은 프로세스가 남긴 요청 수는 TTL 후 무시/정리)
+# - EC2 탐색은 supervisor만 수행하고 결과를 Redis(ollama_hosts)에 게시,
+#   자식 프로세스는 그 목록을 읽어 사용
+# =========================================================
+OLLAMA_HOSTS = [h.strip().rstrip("/") for h in os.getenv("OLLAMA_HOSTS", "").split(",") if h.strip()]
+OLLAMA_HEALTH_INTERVAL_SECONDS = float(os.getenv("OLLAMA_HEALTH_INTERVAL_SECONDS", "10"))
+OLLAMA_DISCOVERY_INTERVAL_SECONDS = float(os.getenv("OLLAMA_DISCOVERY_INTERVAL_SECONDS", "60"))
+OLLAMA_PROBE_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_PROBE_TIMEOUT_SECONDS", "2"))
+# 프로세스 heartbeat TTL (프로세스가 죽어 감소시키지 못한 요청 수는 이 시간 뒤 무시)
+OLLAMA_INFLIGHT_TTL_SECONDS = int(os.getenv("OLLAMA_INFLIGHT_TTL_SECONDS", "60"))
+
+OLLAMA_HOSTS_KEY = "ollama_hosts"
+
+
+def inflight_key(host: str) -> str:
+    return f"ollama_inflight:{host}"
+
+
+def owner_key(owner: str) -> str:
+    return f"ollama_inflight_owner:{owner}"
+
+
+def publish_hosts(client, hosts):
+    """supervisor가 탐색한 호스트 목록을 게시 (갱신이 끊기면 만료되어 정적 목록으로 복귀)."""
+    ttl = int(OLLAMA_DISCOVERY_INTERVAL_SECONDS * 3)
+    client.set(OLLAMA_HOSTS_KEY, json.dumps(list(hosts)), ex=max(ttl, 60))
+
+
+def shared_hosts(client):
+    """자식 프로세스용 discover 콜백: supervisor가 게시한 목록."""
+    raw = client.get(OLLAMA_HOSTS_KEY)
+    return json.loads(raw) if raw else []
+
+
+class Backend:
+    def __init__(self, host: str):
+        self.host = host
+        self.healthy = True  # 첫 probe 전에는 살아있다고 가정
+        self.outstanding = 0
+        self.failures = 0
+        self.checked_at = 0.0
+
+
+class OllamaPool:
+    def __init__(self, hosts=(), discover=None, fallback: str = None, redis_client=None):
+        self.static_hosts = list(hosts)
+        self.discover = discover
+        self.fallback = fallback
+        self.redis = redis_client
+        # 요청 수를 기록하는 주체 (pod 간 pid 충돌을 피하도록 hostname + 임의값 포함)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.backends = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._thread = None
+        self._discovered_at = 0.0
+        self.refresh()
+
+    # ---------- 구성 ----------
+    def refresh(self):
+        """정적 목록과 탐색 결과를 합쳐 백엔드 목록을 갱신합니다."""
+        discovered = []
+        self._discovered_at = time.monotonic()
+        if self.discover is not None:
+            try:
+                discovered = list(self.discover() or [])
+            except Exception as e:
+                # 일시적 실패로 멀쩡한 호스트를 잃지 않도록 기존 목록 유지
+                print(f"❌ Ollama discovery failed: {e}")
+                if self.backends:
+                    return
+
+        hosts = list(dict.fromkeys(self.static_hosts + discovered))
+        if not hosts and self.fallback:
+            hosts = [self.fallback]
+
+        with self._lock:
+            # 기존 백엔드는 상태(진행 중 요청 수 등)를 유지
+            self.backends = {h: self.backends.get(h) or Backend(h) for h in hosts}
+
+    def hosts(self):
+        with self._lock:
+            return list(self.backends)
+
+    # ---------- 헬스 체크 ----------
+    def probe(self, backend: Backend) -> bool:
+        try:
+            r = self._session.get(f"{backend.host}/api/tags", timeout=OLLAMA_PROBE_TIMEOUT_SECONDS)
+            ok = r.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        with self._lock:
+            if ok != backend.healthy:
+                print(f"{'✅' if ok else '⚠️ '} Ollama {backend.host} is {'up' if ok else 'down'}")
+            backend.healthy = ok
+            backend.failures = 0 if ok else backend.failures + 1
+            backend.checked_at = time.monotonic()
+        return ok
+
+    def check_all(self):
+        with self._lock:
+            backends = list(self.backends.values())
+        for backend in backends:
+            self.probe(backend)
+
+    def _loop(self):
+        while True:
+            time.sleep(OLLAMA_HEALTH_INTERVAL_SECONDS)
+            self._heartbeat()
+            if time.monotonic() - self._discovered_at >= OLLAMA_DISCOVERY_INTERVAL_SECONDS:
+                self.refresh()
+            self.check_all()
+
+    def start(self):
+        """백그라운드 헬스 체크/탐색 스레드 시작 (프로세스마다 한 번)."""
+        self._heartbeat()
+        self.check_all()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="ollama-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    # ---------- 진행 중 요청 수 (Redis 공유, 실패 시 프로세스 로컬) ----------
+    def _heartbeat(self):
+        """이 프로세스의 요청 수가 유효함을 알림 (끊기면 TTL 후 다른 프로세스가 무시)"""
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(owner_key(self.owner), 1, ex=OLLAMA_INFLIGHT_TTL_SECONDS)
+        except Exception as e:
+            print(f"⚠️  Ollama in-flight heartbeat failed: {e}")
+
+    def _load(self, backends) -> dict:
+        if self.redis is not None:
+            try:
+                return self._load_shared(backends)
+            except Exception as e:
+                print(f"⚠️  Ollama in-flight lookup failed, using local counts: {e}")
+        return {b.host: b.outstanding for b in backends}
+
+    def _load_shared(self, backends) -> dict:
+        pipe = self.redis.pipeline(transaction=False)
+        for b in backends:
+            pipe.hgetall(inflight_key(b.host))
+        counts = dict(zip((b.host for b in backends), pipe.execute()))
+
+        owners = sorted({owner for fields in counts.values() for owner in fields})
+        alive = dict(zip(owners, self.redis.mget([owner_key(o) for o in owners]))) if owners else {}
+
+        load, dead = {}, []
+        for host, fields in counts.items():
+            load[host] = 0
+            for owner, value in fields.items():
+                # heartbeat가 끊긴 프로세스(죽었거나 멈춤)의 몫은 제외하고 정리
+                if alive.get(owner) is None and owner != self.owner:
+                    dead.append((host, owner))
+                    continue
+                load[host] += max(0, int(value))
+        if dead:
+            pipe = self.redis.pipeline(transaction=False)
+            for host, owner in dead:
+                pipe.hdel(inflight_key(host), owner)
+            pipe.execute()
+        return load
+
+    def _add(self, backend: Backend, delta: int):
+        with self._lock:
+            backend.outstanding += delta
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hincrby(inflight_key(backend.host), self.owner, delta)
+                pipe.set(owner_key(self.owner), 1, ex=OLLAMA_INFLIGHT_TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                print(f"⚠️  Ollama in-flight update failed: {e}")
+
+    # ---------- 라우팅 ----------
+    def _pick(self, exclude) -> Backend:
+        with self._lock:
+            candidates = [b for b in self.backends.values() if b.host not in exclude]
+        healthy = [b for b in candidates if b.healthy]
+        # 모두 unhealthy면 probe가 틀렸을 수도 있으니 남은 후보라도 시도
+        pool = healthy or candidates
+        if not pool:
+            return None
+        load = self._load(pool)
+        least = min(load.values())
+        backend = random.choice([b for b in pool if load[b.host] == least])
+        self._add(backend, 1)
+        return backend
+
+    @contextmanager
+    def acquire(self, exclude=()):
+        """진행 중 요청이 가장 적은 호스트를 빌려줍니다. 없으면 None."""
+        backend = self._pick(set(exclude))
+        try:
+            yield backend.host if backend else None
+        finally:
+            if backend:
+                self._add(backend, -1)
+
+    def mark_down(self, host: str):
+        """요청 중 연결 실패 → 다음 probe 전까지 라우팅 대상에서 제외."""
+        with self._lock:
+            backend = self.backends.get(host)
+            if backend and backend.healthy:
+                print(f"⚠️  Ollama {host} marked down")
+                backend.healthy = False
+                backend.failures += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            backends = list(self.backends.values())
+        load = self._load(backends) if backends else {}
+        return {
+            b.host: {"healthy": b.healthy, "outstanding": load[b.host], "failures": b.failures}
+            for b in backends
+        }
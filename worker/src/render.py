@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+쇼츠 렌더링 (멀티 출력 단일 디코드)
+
+run_ffmpeg_shorts.sh 와 같은 결과물을 만들지만,
+입력을 한 번만 디코드/스케일/패딩한 뒤 split 으로 나눠
+variant 마다 drawtext + 인코딩만 따로 수행합니다.
+
+  [0:v] scale → pad → drawbox(상/하단 바) → split=N
+        ├─ drawtext(v1) → libx264 → out_v1.mp4
+        └─ drawtext(v2) → libx264 → out_v2.mp4
+
+RENDER_OVERLAY=png (기본) 이면 바 + 자막을 variant마다 RGBA PNG로 한 번만
+그려 두고(캐시), 프레임마다 overlay 한 번으로 합성합니다.
+
+  [0:v] scale → pad → split=N
+        ├─ overlay([1:v] v1.png) → libx264 → out_v1.mp4
+        └─ overlay([2:v] v2.png) → libx264 → out_v2.mp4
+
+출력 해상도는 ffprobe 결과로 정합니다 (plan_geometry).
+원본보다 큰 해상도로 늘리지 않고, 이미 목표 크기면 scale/pad를 생략합니다.
+
+package_hls() 는 렌더링된 결과물로 HLS(fMP4/CMAF 세그먼트) 비트레이트 사다리를 만듭니다.
+
+입력은 로컬 파일 또는 (presigned) HTTP URL,
+출력은 파일 경로 또는 "pipe:<fd>" (fragmented MP4로 기록) 를 받을 수 있습니다.
+"""
+import os
+import json
+import hashlib
+import subprocess
+import tempfile
+
+FONT = os.getenv("CAPTION_FONT", "/usr/share/fonts/paperlogy/Paperlogy-7Bold.ttf")
+
+WIDTH = 1080
+HEIGHT = 1920
+BAR_HEIGHT = 200
+FONT_SIZE = 64
+
+# 자막 합성 방식
+# - png : 바/자막을 RGBA PNG로 한 번 래스터화한 뒤 overlay (기본)
+# - draw: 프레임마다 drawbox + drawtext (기존 방식)
+RENDER_OVERLAY = os.getenv("RENDER_OVERLAY", "png")
+OVERLAY_CACHE_DIR = os.getenv("OVERLAY_CACHE_DIR", os.path.join(tempfile.gettempdir(), "caption_overlays"))
+OVERLAY_CACHE_MAX_FILES = int(os.getenv("OVERLAY_CACHE_MAX_FILES", "500"))
+# 오버레이 모양(바 색/위치 등)을 바꾸면 올려서 기존 캐시 무효화
+OVERLAY_VERSION = 1
+
+# HLS 사다리 "세로해상도:비디오비트레이트" (렌더링 해상도보다 큰 단계는 제외)
+HLS_LADDER = [
+    (int(height), bitrate)
+    for height, bitrate in (
+        rung.split(":") for rung in os.getenv("HLS_LADDER", "1280:2500k,854:1200k,640:700k").split(",")
+    )
+]
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "2"))
+
+# 작업 하나(ffmpeg 프로세스)가 쓸 인코더 스레드 수 (0이면 ffmpeg 자동 = 코어 수)
+# 동시 작업이 여러 개면 worker supervisor가 CPU / 동시 처리 수로 설정
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "0"))
+HLS_AUDIO_BITRATE = os.getenv("HLS_AUDIO_BITRATE", "96k")
+
+# 출력 해상도 후보 (9:16). 원본을 늘리지 않는 가장 큰 후보를 고릅니다.
+TIERS = ((480, 854), (720, 1280), (WIDTH, HEIGHT))
+
+
+# ---------------------------------------------------------
+# ffprobe
+# ---------------------------------------------------------
+def summarize_probe(data: dict) -> dict:
+    """ffprobe JSON에서 렌더링 계획에 필요한 값만 추립니다."""
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    rotation = int(float(video.get("tags", {}).get("rotate", 0) or 0))
+    for side_data in video.get("side_data_list", []):
+        if "rotation" in side_data:
+            rotation = int(side_data["rotation"])
+
+    width, height = int(video.get("width", 0)), int(video.get("height", 0))
+    # ffmpeg는 회전 메타데이터를 자동 적용하므로 필터가 보는 크기로 맞춤
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+
+    return {
+        "width": width,
+        "height": height,
+        "sar": video.get("sample_aspect_ratio", "1:1"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "duration": float(data.get("format", {}).get("duration", 0) or 0),
+    }
+
+
+def probe(input_path: str) -> dict:
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-print_format", "json",
+            "-show_streams", "-show_format",
+            input_path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return summarize_probe(json.loads(result.stdout))
+
+
+# ---------------------------------------------------------
+# 출력 해상도 계획
+# ---------------------------------------------------------
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2)
+
+
+def plan_geometry(media: dict = None) -> dict:
+    """
+    media(probe 결과)가 없으면 기존과 같은 1080x1920.
+    원본을 확대하지 않는 가장 큰 후보를 고르고, 바/글자 크기는 비율대로 줄입니다.
+    """
+    width, height = WIDTH, HEIGHT
+    src_w, src_h = (media or {}).get("width"), (media or {}).get("height")
+    if src_w and src_h:
+        fits = [(w, h) for w, h in TIERS if min(w / src_w, h / src_h) <= 1]
+        width, height = fits[-1] if fits else TIERS[0]
+
+    ratio = width / WIDTH
+    square_pixels = (media or {}).get("sar", "1:1") in ("1:1", "0:1", "N/A")
+    return {
+        "width": width,
+        "height": height,
+        "bar": _even(BAR_HEIGHT * ratio),
+        "font": max(1, round(FONT_SIZE * ratio)),
+        # 이미 목표 크기(정사각 픽셀)면 scale/pad 생략
+        "scale": not (src_w == width and src_h == height and square_pixels),
+    }
+
+
+# ---------------------------------------------------------
+# 필터 그래프 / 명령어
+# ---------------------------------------------------------
+def _frame_filter(geometry: dict) -> str:
+    """캔버스 크기 맞추기 (이미 목표 크기면 빈 문자열)"""
+    w, h = geometry["width"], geometry["height"]
+    if not geometry["scale"]:
+        return ""
+    return ",".join([
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease",
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:black",
+        "setsar=1",
+    ])
+
+
+def _bar_filter(geometry: dict, replace: bool = False) -> str:
+    """상/하단 반투명 바. replace=True면 (RGBA 캔버스에) 알파까지 그대로 기록"""
+    w, h, bar = geometry["width"], geometry["height"], geometry["bar"]
+    mode = ":replace=1" if replace else ""
+    return ",".join([
+        f"drawbox=x=0:y=0:w={w}:h={bar}:color=black@0.65:t=fill{mode}",
+        f"drawbox=x=0:y={h - bar}:w={w}:h={bar}:color=black@0.65:t=fill{mode}",
+    ])
+
+
+def _base_filter(geometry: dict) -> str:
+    """모든 variant에 공통인 부분 (스케일/패딩/반투명 바)"""
+    return ",".join(f for f in (_frame_filter(geometry), _bar_filter(geometry)) if f)
+
+
+def _caption_filter(caption_file: str, geometry: dict) -> str:
+    bar = geometry["bar"]
+    bar_y = geometry["height"] - bar
+    return (
+        f"drawtext=fontfile={FONT}:textfile={caption_file}:"
+        f"fontcolor=white:fontsize={geometry['font']}:"
+        f"x=(w-text_w)/2:y={bar_y}+({bar}-text_h)/2"
+    )
+
+
+def build_filter_graph(layers: list, geometry: dict = None, overlay: bool = False) -> str:
+    """
+    layers: draw 모드면 자막 textfile 경로, overlay 모드면 PNG 경로 (입력 1..N 순서)
+    """
+    geometry = geometry or plan_geometry()
+    n = len(layers)
+    labels = "".join(f"[b{i}]" for i in range(n))
+    shared = _frame_filter(geometry) if overlay else _base_filter(geometry)
+    parts = ["[0:v]" + ",".join(f for f in (shared, f"split={n}") if f) + labels]
+    for i, layer in enumerate(layers):
+        if overlay:
+            # PNG는 한 프레임뿐이라 eof_action=repeat(기본)로 계속 재사용됨
+            parts.append(f"[b{i}][{i + 1}:v]overlay=0:0[v{i}]")
+        else:
+            parts.append(f"[b{i}]{_caption_filter(layer, geometry)}[v{i}]")
+    return ";".join(parts)
+
+
+# ---------------------------------------------------------
+# 자막 오버레이 PNG (캐시)
+# ---------------------------------------------------------
+def _font_fingerprint() -> str:
+    try:
+        st = os.stat(FONT)
+        return f"{FONT}:{st.st_size}:{int(st.st_mtime)}"
+    except OSError:
+        return FONT
+
+
+def overlay_cache_key(text: str, geometry: dict) -> str:
+    material = json.dumps(
+        [OVERLAY_VERSION, text, _font_fingerprint(),
+         geometry["width"], geometry["height"], geometry["bar"], geometry["font"]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+def _trim_overlay_cache():
+    try:
+        entries = [os.path.join(OVERLAY_CACHE_DIR, n) for n in os.listdir(OVERLAY_CACHE_DIR) if n.endswith(".png")]
+        if len(entries) <= OVERLAY_CACHE_MAX_FILES:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - OVERLAY_CACHE_MAX_FILES]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def rasterize_overlay(text: str, geometry: dict) -> str:
+    """바 + 자막을 투명 배경 RGBA PNG 한 장으로 그려 캐시 경로를 반환합니다."""
+    os.makedirs(OVERLAY_CACHE_DIR, exist_ok=True)
+    path = os.path.join(OVERLAY_CACHE_DIR, f"{overlay_cache_key(text, geometry)}.png")
+    if os.path.exists(path):
+        os.utime(path)  # LRU 정리용
+        return path
+
+    fd, caption_file = tempfile.mkstemp(prefix="caption.", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    fd, tmp_png = tempfile.mkstemp(dir=OVERLAY_CACHE_DIR, suffix=".png.tmp")
+    os.close(fd)
+    try:
+        w, h = geometry["width"], geometry["height"]
+        canvas = (
+            f"color=c=black@0.0:s={w}x{h}:d=1,format=rgba,"
+            f"{_bar_filter(geometry, replace=True)},"
+            f"{_caption_filter(caption_file, geometry)}"
+        )
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "lavfi", "-i", canvas, "-frames:v", "1", "-c:v", "png", "-f", "image2", tmp_png],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        # 여러 프로세스가 동시에 만들어도 안전하도록 rename으로 교체
+        os.replace(tmp_png, path)
+    finally:
+        os.remove(caption_file)
+        if os.path.exists(tmp_png):
+            os.remove(tmp_png)
+    _trim_overlay_cache()
+    return path
+
+
+def _input_args(input_path: str) -> list:
+    if input_path.startswith(("http://", "https://")):
+        # S3 presigned URL 직접 읽기: 연결이 끊기면 이어서 받음
+        return ["-reconnect", "1", "-reconnect_on_network_error", "1", "-reconnect_delay_max", "5", "-i", input_path]
+    return ["-i", input_path]
+
+
+def _container_args(output_path: str) -> list:
+    if output_path.startswith("pipe:"):
+        # 파이프는 seek 불가 → moov를 앞에 쓰는 fragmented MP4
+        return ["-movflags", "+frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    return ["-movflags", "+faststart"]
+
+
+def _thread_args(encoders: int) -> list:
+    """libx264 인코더가 encoders개 동시에 돌므로 스레드 예산을 나눠 가짐"""
+    if FFMPEG_THREADS <= 0:
+        return []
+    return ["-threads", str(max(1, FFMPEG_THREADS // max(1, encoders)))]
+
+
+def build_command(
+    input_path: str,
+    layers: list,
+    output_paths: list,
+    geometry: dict = None,
+    copy_audio: bool = False,
+    overlay: bool = False,
+) -> list:
+    # 원본 오디오가 이미 AAC면 재인코딩하지 않음
+    audio_args = ["-c:a", "copy"] if copy_audio else ["-c:a", "aac", "-b:a", "128k"]
+    cmd = ["ffmpeg", "-y", *_input_args(input_path)]
+    if overlay:
+        for png in layers:
+            cmd += ["-i", png]
+    cmd += ["-filter_complex", build_filter_graph(layers, geometry, overlay)]
+    for i, output_path in enumerate(output_paths):
+        cmd += [
+            "-map", f"[v{i}]",
+            "-map", "0:a?",
+            "-c:v", "libx264",
+            *_thread_args(len(output_paths)),
+            "-pix_fmt", "yuv420p",
+            "-preset", "veryfast",
+            *audio_args,
+            *_container_args(output_path),
+            output_path,
+        ]
+    return cmd
+
+
+def render_variants(input_path: str, outputs: dict, pass_fds=(), media: dict = None) -> dict:
+    """
+    outputs: {variant: (caption_text, output_path)}
+    모든 variant를 ffmpeg 한 번으로 렌더링합니다. 실패 시 CalledProcessError.
+    output_path가 "pipe:<fd>" 이면 해당 fd를 pass_fds로 넘겨야 합니다.
+    media: probe() 결과 (없으면 1080x1920 / AAC 재인코딩). 사용한 geometry를 반환합니다.
+    """
+    geometry = plan_geometry(media)
+    copy_audio = bool(media) and media.get("audio_codec") == "aac"
+    print(
+        f"📐 Render plan: {geometry['width']}x{geometry['height']} "
+        f"(source {(media or {}).get('width')}x{(media or {}).get('height')}, "
+        f"scale={'yes' if geometry['scale'] else 'skip'}, audio={'copy' if copy_audio else 'aac'})"
+    )
+    overlay = RENDER_OVERLAY == "png"
+    output_paths = [path for _, path in outputs.values()]
+
+    if overlay:
+        layers = [rasterize_overlay(text, geometry) for text, _ in outputs.values()]
+        subprocess.run(
+            build_command(input_path, layers, output_paths, geometry, copy_audio, overlay=True),
+            check=True,
+            pass_fds=tuple(pass_fds),
+        )
+        return geometry
+
+    caption_files = []
+    try:
+        for variant, (text, _) in outputs.items():
+            # drawtext 이스케이프 문제를 피하려고 textfile 사용 (쉘 스크립트와 동일)
+            fd, path = tempfile.mkstemp(prefix="caption.", suffix=".txt")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            caption_files.append(path)
+
+        subprocess.run(
+            build_command(input_path, caption_files, output_paths, geometry, copy_audio),
+            check=True,
+            pass_fds=tuple(pass_fds),
+        )
+    finally:
+        for path in caption_files:
+            if os.path.exists(path):
+                os.remove(path)
+    return geometry
+
+
+# ---------------------------------------------------------
+# HLS 사다리 (fMP4 세그먼트)
+# ---------------------------------------------------------
+def _bits(bitrate: str) -> int:
+    units = {"k": 1000, "m": 1000 * 1000}
+    unit = bitrate[-1].lower()
+    return int(float(bitrate[:-1]) * units[unit]) if unit in units else int(bitrate)
+
+
+def hls_rungs(geometry: dict) -> list:
+    rungs = sorted((r for r in HLS_LADDER if r[0] <= geometry["height"]), reverse=True)
+    return rungs or [min(HLS_LADDER)]
+
+
+def package_hls(input_path: str, out_dir: str, geometry: dict) -> str:
+    """
+    렌더링된 mp4를 out_dir/r{i}/index.m3u8 (+ init/세그먼트) 로 나누고
+    out_dir/master.m3u8 경로를 반환합니다. 모든 단계의 키프레임 위치를 맞춰 전환이 매끄럽습니다.
+    """
+    has_audio = bool(probe(input_path).get("audio_codec"))
+    rungs = hls_rungs(geometry)
+    n = len(rungs)
+    for i in range(n):
+        os.makedirs(os.path.join(out_dir, f"r{i}"), exist_ok=True)
+
+    labels = "".join(f"[s{i}]" for i in range(n))
+    graph = [f"[0:v]split={n}{labels}"]
+    graph += [f"[s{i}]scale=-2:{height}[o{i}]" for i, (height, _) in enumerate(rungs)]
+
+    cmd = ["ffmpeg", "-y", *_input_args(input_path), "-filter_complex", ";".join(graph)]
+    for i, (_, bitrate) in enumerate(rungs):
+        cmd += ["-map", f"[o{i}]"]
+        if has_audio:
+            cmd += ["-map", "0:a:0"]
+        cmd += [f"-b:v:{i}", bitrate, f"-maxrate:v:{i}", bitrate, f"-bufsize:v:{i}", f"{_bits(bitrate) * 2}"]
+    cmd += [
+        "-c:v", "libx264",
+        *_thread_args(n),
+        "-pix_fmt", "yuv420p",
+        "-preset", "veryfast",
+        "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+    ]
+    if has_audio:
+        cmd += ["-c:a", "aac", "-b:a", HLS_AUDIO_BITRATE]
+    stream_map = " ".join(f"v:{i},a:{i}" if has_audio else f"v:{i}" for i in range(n))
+    cmd += [
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_type", "fmp4",
+        "-hls_segment_filename", os.path.join(out_dir, "r%v", "seg_%03d.m4s"),
+        "-var_stream_map", stream_map,
+        os.path.join(out_dir, "r%v", "index.m3u8"),
+    ]
+    subprocess.run(cmd, check=True)
+
+    # master playlist는 직접 작성 (BANDWIDTH/RESOLUTION)
+    audio_bits = _bits(HLS_AUDIO_BITRATE) if has_audio else 0
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for i, (height, bitrate) in enumerate(rungs):
+        width = _even(geometry["width"] * height / geometry["height"])
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={_bits(bitrate) + audio_bits},RESOLUTION={width}x{height}")
+        lines.append(f"r{i}/index.m3u8")
+    master = os.path.join(out_dir, "master.m3u8")
+    with open(master, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return master
@@ -1,25 +1,58 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 import time
 import tempfile
+import shutil
+import signal
 import subprocess
+import concurrent.futures
 import redis
 import boto3
 from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+
+import render
+import generate_caption
+from caption_cache import CaptionCache, CAPTION_CACHE_ENABLED, cache_stats
+from ollama_pool import OllamaPool, OLLAMA_HOSTS, OLLAMA_DISCOVERY_INTERVAL_SECONDS, publish_hosts, shared_hosts
+from job_queue import JobQueue, MAX_ATTEMPTS, dlq_cli
 
 # --- 환경변수 로드 ---
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_QUEUE = os.getenv("REDIS_QUEUE", "video_processing_jobs")
 
 # AWS S3 설정
 AWS_REGION = os.getenv("AWS_REGION", "ap-northeast-2")
 AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET", "team1videostorage-justic")
 
+# 동시 처리 개수 (0 또는 미설정이면 CPU/메모리 기준 자동 계산, 설정 시 상한)
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "0"))
+# 작업 1개가 쓰는 대략적인 메모리 (ffmpeg + 임시 파일 버퍼)
+JOB_MEMORY_MB = int(os.getenv("JOB_MEMORY_MB", "1024"))
+
+# 렌더링 방식
+# - multi : 한 번 디코드해서 모든 variant를 동시에 인코딩 (render.py)
+# - script: variant마다 run_ffmpeg_shorts.sh 실행 (기존 방식)
+RENDER_MODE = os.getenv("RENDER_MODE", "multi")
+
+# Ollama 백엔드 탐색: Name 태그가 일치하는 running EC2 인스턴스 (빈 값이면 탐색 안 함)
+# 정적 목록은 OLLAMA_HOSTS (콤마 구분), 둘 다 없으면 OLLAMA_HOST 사용
+OLLAMA_DISCOVERY_TAG = os.getenv("OLLAMA_DISCOVERY_TAG", "ai-worker-cpu")
+
+# 스트리밍 I/O (multi 렌더링 전용)
+# - 입력: 다운로드 대신 presigned URL을 ffmpeg가 직접 읽음
+# - 출력: fragmented MP4를 파이프로 내보내며 동시에 S3 multipart 업로드
+STREAM_IO = os.getenv("STREAM_IO", "0") == "1"
+STREAM_INPUT_URL_EXPIRES_SECONDS = int(os.getenv("STREAM_INPUT_URL_EXPIRES_SECONDS", "3600"))
+STREAM_PART_SIZE_MB = int(os.getenv("STREAM_PART_SIZE_MB", "8"))
+
+# HLS(fMP4) 비트레이트 사다리도 함께 생성 (multi 렌더링 전용)
+HLS_ENABLED = os.getenv("HLS_ENABLED", "1") == "1"
+
 # 스크립트 경로
 FFMPEG_SCRIPT = os.getenv("FFMPEG_SCRIPT", "/opt/ai/scripts/run_ffmpeg_shorts.sh")
-CAPTION_SCRIPT = os.getenv("CAPTION_SCRIPT", "/opt/ai/worker/generate_caption.py")
 
 # --- Redis 연결 ---
 print(f"🔌 Connecting to Redis at {REDIS_HOST}:{REDIS_PORT}...")
@@ -37,31 +70,45 @@ ec2_client = boto3.client('ec2', region_name=AWS_REGION)
 # ---------------------------------------------------------
 # EC2 자동 탐색 함수
 # ---------------------------------------------------------
-def get_ollama_server_ip():
-    target_name = "ai-worker-cpu"
-    print(f"🔍 Searching for EC2 instance named '{target_name}'...")
-    try:
-        response = ec2_client.describe_instances(
-            Filters=[
-                {'Name': 'tag:Name', 'Values': [target_name]},
-                {'Name': 'instance-state-name', 'Values': ['running']}
-            ]
-        )
-        for reservation in response['Reservations']:
-            for instance in reservation['Instances']:
-                private_ip = instance.get('PrivateIpAddress')
-                if private_ip:
-                    print(f"✅ Found Server: {private_ip}")
-                    return f"http://{private_ip}:11434"
-        return None
-    except Exception as e:
-        print(f"❌ AWS API Error: {e}")
-        return None
+def discover_ollama_hosts():
+    """태그가 일치하는 running 인스턴스 전부를 Ollama 후보로 반환합니다."""
+    target_name = OLLAMA_DISCOVERY_TAG
+    hosts = []
+    response = ec2_client.describe_instances(
+        Filters=[
+            {'Name': 'tag:Name', 'Values': [target_name]},
+            {'Name': 'instance-state-name', 'Values': ['running']}
+        ]
+    )
+    for reservation in response['Reservations']:
+        for instance in reservation['Instances']:
+            private_ip = instance.get('PrivateIpAddress')
+            if private_ip:
+                hosts.append(f"http://{private_ip}:11434")
+    return hosts
+
+def build_ollama_pool():
+    """supervisor용: EC2를 직접 탐색합니다."""
+    discover = discover_ollama_hosts if OLLAMA_DISCOVERY_TAG else None
+    return OllamaPool(OLLAMA_HOSTS, discover=discover, fallback=generate_caption.OLLAMA_HOST)
 
-CURRENT_OLLAMA_HOST = get_ollama_server_ip()
-if not CURRENT_OLLAMA_HOST:
-    print("⚠️  Ollama server not found. Using localhost.")
-    CURRENT_OLLAMA_HOST = "http://localhost:11434"
+def build_child_ollama_pool():
+    """자식용: supervisor가 게시한 목록을 읽고, 요청 수는 Redis로 공유합니다."""
+    return OllamaPool(
+        OLLAMA_HOSTS,
+        discover=lambda: shared_hosts(redis_client),
+        fallback=generate_caption.OLLAMA_HOST,
+        redis_client=redis_client,
+    )
+
+def sync_ollama_hosts():
+    """EC2 탐색 결과를 자식 프로세스들에게 게시 (supervisor에서만 호출)."""
+    ollama_pool.refresh()
+    publish_hosts(redis_client, ollama_pool.hosts())
+
+print(f"🔍 Resolving Ollama backends (static={OLLAMA_HOSTS}, tag='{OLLAMA_DISCOVERY_TAG}')...")
+ollama_pool = build_ollama_pool()
+print(f"✅ Ollama backends: {ollama_pool.hosts()}")
 
 def download_object(key, dst):
     """S3에서 파일을 다운로드합니다."""
@@ -86,103 +133,589 @@ def upload_object(key, src):
         print(f"❌ Upload failed: {e}")
         raise
 
-def process_job(job: dict):
-    input_key = job["input_key"]
-    # _processed.mp4를 잘라내어 베이스 키 생성 (예: user_id/task_id)
-    base_output_key = job["output_key"].replace("_processed.mp4", "")
+def presigned_input_url(key):
+    """ffmpeg가 직접 읽을 수 있는 GET URL (서명 포함이므로 로그에 남기지 않음)"""
+    print(f"🔗 Streaming input from s3://{AWS_S3_BUCKET}/{key}")
+    return s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": AWS_S3_BUCKET, "Key": key},
+        ExpiresIn=STREAM_INPUT_URL_EXPIRES_SECONDS,
+    )
+
+STREAM_TRANSFER_CONFIG = TransferConfig(
+    multipart_chunksize=STREAM_PART_SIZE_MB * 1024 * 1024,
+    max_concurrency=4,
+)
 
-    # 임시 파일 생성
-    tmp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+def upload_stream(key, read_fd):
+    """파이프에서 읽으면서 S3 multipart 업로드 (EOF가 오면 완료)"""
+    print(f"⬆️  Streaming upload -> s3://{AWS_S3_BUCKET}/{key}")
+    # 업로드가 실패해도 읽기 쪽을 닫아 ffmpeg가 막히지 않도록 with 사용
+    with os.fdopen(read_fd, "rb") as stream:
+        s3_client.upload_fileobj(
+            stream,
+            AWS_S3_BUCKET,
+            key,
+            ExtraArgs={'ContentType': 'video/mp4'},
+            Config=STREAM_TRANSFER_CONFIG,
+        )
+
+# ---------------------------------------------------------
+# 작업 상태 갱신 (WAS의 task:{task_id} hash + task_events 채널)
+# ---------------------------------------------------------
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", "86400"))
 
+def job_task_id(job: dict) -> str:
+    """job에 task_id가 없으면 input_key(user_id/task_id.mp4)에서 추출"""
+    if job.get("task_id"):
+        return job["task_id"]
+    return os.path.basename(job["input_key"]).replace(".mp4", "")
+
+def publish_variant_state(task_id: str, variant: str, state: str, **extra):
+    """
+    variant 상태를 기록하고 SSE 구독자에게 v1_READY 같은 이벤트를 발행합니다.
+    extra(render_ms, upload_ms, ready_at, error ...)는 {variant}_{name} 필드로 함께 저장됩니다.
+    """
+    key = f"task:{task_id}"
+    fields = {f"{variant}_status": state, "updated_at": time.time()}
+    fields.update({f"{variant}_{name}": value for name, value in extra.items() if value is not None})
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, TASK_TTL_SECONDS)
+        pipe.publish(
+            f"task_events:{task_id}",
+            json.dumps(
+                {"task_id": task_id, "event": f"{variant}_{state}", "variant": variant, **extra},
+                ensure_ascii=False,
+            ),
+        )
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        # 상태 갱신 실패가 렌더링 자체를 실패시키지는 않음
+        print(f"⚠️ Task state update failed ({task_id} {variant}={state}): {e}")
+
+def set_variant_fields(task_id: str, variant: str, **fields):
+    """상태 전이 없이 {variant}_{name} 필드만 기록 (이벤트 발행 없음)"""
     try:
-        # 1. S3 다운로드
-        download_object(input_key, tmp_input)
-
-        # 2. 캡션 생성 (subprocess) - JSON 문자열로 반환됨
-        print(f"🧠 Generating captions (v1 & v2) via Ollama ({CURRENT_OLLAMA_HOST})...")
-        
-        env = os.environ.copy()
-        env["OLLAMA_HOST"] = CURRENT_OLLAMA_HOST
-        
-        caption_output = "{}"
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(f"task:{task_id}", mapping={f"{variant}_{name}": value for name, value in fields.items()})
+        pipe.expire(f"task:{task_id}", TASK_TTL_SECONDS)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Task field update failed ({task_id} {variant}): {e}")
+
+VARIANTS = ("v1", "v2")
+
+def variant_states(task_id: str) -> dict:
+    """{variant: status} (기록이 없으면 None)"""
+    statuses = redis_client.hmget(f"task:{task_id}", [f"{variant}_status" for variant in VARIANTS])
+    return dict(zip(VARIANTS, statuses))
+
+def mark_job_dead(fields: dict, error: str):
+    """
+    dead-letter 처리된 작업의 variant 중 READY가 아닌 것을 FAILED로 알립니다.
+    (워커가 죽어 회수된 작업은 RENDERING 상태로 남아 SSE가 끝나지 않으므로)
+    """
+    task_id = job_task_id(json.loads(fields["job"]))
+    for variant, status in variant_states(task_id).items():
+        if status not in ("READY", "FAILED"):
+            publish_variant_state(task_id, variant, "FAILED", error=error[:300])
+
+def publish_all_variants(task_id: str, variants, state: str, **extra):
+    for variant in variants:
+        publish_variant_state(task_id, variant, state, **extra)
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.monotonic() - started) * 1000)
+
+# ---------------------------------------------------------
+# HLS 패키징 (S3: {user_id}/{task_id}/hls/{variant}/master.m3u8)
+# ---------------------------------------------------------
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+def hls_prefix(base_output_key: str, variant: str) -> str:
+    return f"{base_output_key}/hls/{variant}"
+
+def upload_hls(out_dir: str, prefix: str):
+    """세그먼트/재생목록을 병렬 업로드. master.m3u8은 마지막에 올려 존재 = 완료가 되도록 함"""
+    files = []
+    for root, _, names in os.walk(out_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((path, f"{prefix}/{os.path.relpath(path, out_dir)}"))
+    master = [f for f in files if f[1] == f"{prefix}/master.m3u8"]
+    rest = [f for f in files if f not in master]
+
+    def _put(item):
+        path, key = item
+        content_type = HLS_CONTENT_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+        s3_client.upload_file(path, AWS_S3_BUCKET, key, ExtraArgs={'ContentType': content_type})
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as uploader:
+        list(uploader.map(_put, rest))
+    for item in master:
+        _put(item)
+
+def publish_hls(task_id, base_output_key, sources: dict, geometry: dict):
+    """
+    sources: {variant: 렌더링된 mp4 경로 또는 URL}
+    HLS 실패는 mp4 결과에 영향을 주지 않음 ({variant}_hls=FAILED 만 기록)
+    """
+    for variant, source in sources.items():
+        out_dir = tempfile.mkdtemp(prefix=f"hls_{variant}_")
+        started = time.monotonic()
         try:
-            caption_output = subprocess.check_output(
-                ["python3", CAPTION_SCRIPT, tmp_input],
-                text=True,
-                timeout=600,
-                env=env,
-            ).strip()
-        except subprocess.CalledProcessError as e:
-            print(f"⚠️ Caption generation failed: {e}")
-        except subprocess.TimeoutExpired:
-            print("⚠️ Caption generation timed out.")
-        
-        # 3. JSON 파싱
+            print(f"📺 Packaging HLS for {variant}...")
+            render.package_hls(source, out_dir, geometry)
+            upload_hls(out_dir, hls_prefix(base_output_key, variant))
+            set_variant_fields(task_id, variant, hls="READY", hls_ms=_elapsed_ms(started))
+            print(f"✅ {variant} HLS 업로드 완료: {hls_prefix(base_output_key, variant)}/master.m3u8")
+        except Exception as e:
+            print(f"⚠️  HLS packaging failed for {variant}: {e}")
+            set_variant_fields(task_id, variant, hls="FAILED")
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+def render_all_variants(task_id, tmp_input, base_output_key, captions, failed_state="FAILED", media=None):
+    """입력을 한 번만 디코드해서 모든 variant를 렌더링한 뒤 각각 업로드합니다."""
+    if not captions:
+        return
+    outputs = {
+        variant: (text, tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name)
+        for variant, text in captions.items()
+    }
+    try:
+        print(f"🎬 Rendering {list(outputs)} in a single FFmpeg pass...")
+        publish_all_variants(task_id, outputs, "RENDERING")
+        render_started = time.monotonic()
         try:
-            captions = json.loads(caption_output)
-        except json.JSONDecodeError:
-            print(f"⚠️ JSON Parse Error. Raw output: {caption_output}")
-            captions = {"v1": "편집된 영상입니다", "v2": "편집된 영상입니다"}
-
-        print(f"📝 Extracted Captions: {captions}")
-
-        # 4. v1, v2 각각 영상 렌더링 및 업로드
-        for variant, text in captions.items():
-            print(f"🎬 Processing [{variant}] video with FFmpeg... Text: '{text}'")
-            tmp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-            
+            geometry = render.render_variants(tmp_input, outputs, media=media)
+        except Exception as e:
+            print(f"❌ Multi-output render failed: {e}")
+            publish_all_variants(task_id, outputs, failed_state, error=str(e)[:300])
+            raise
+        render_ms = _elapsed_ms(render_started)
+
+        failed = []
+        for variant, (_, tmp_output) in outputs.items():
             # 각각의 S3 저장 경로 생성 (예: user_id/task_id_v1.mp4)
             variant_output_key = f"{base_output_key}_{variant}.mp4"
-
+            publish_variant_state(task_id, variant, "UPLOADING", render_ms=render_ms)
+            upload_started = time.monotonic()
             try:
-                # FFmpeg 실행
-                subprocess.run(
-                    [
-                        FFMPEG_SCRIPT,
-                        tmp_input,
-                        tmp_output,
-                        "", # TTS Wav (없음)
-                        "", # Subtitle (없음)
-                        text, # 생성된 텍스트 자막
-                    ],
-                    check=True,
-                )
-
-                # S3 업로드
                 upload_object(variant_output_key, tmp_output)
                 print(f"✅ {variant} 업로드 완료: {variant_output_key}")
-                
+                publish_variant_state(
+                    task_id, variant, "READY",
+                    upload_ms=_elapsed_ms(upload_started), ready_at=time.time(),
+                )
             except Exception as e:
-                print(f"❌ Error processing {variant}: {e}")
-            finally:
-                if os.path.exists(tmp_output):
-                    os.remove(tmp_output)
+                print(f"❌ Error uploading {variant}: {e}")
+                publish_variant_state(task_id, variant, failed_state, error=str(e)[:300])
+                failed.append(variant)
+        if failed:
+            raise RuntimeError(f"Upload failed for {failed}")
+
+        if HLS_ENABLED:
+            publish_hls(task_id, base_output_key, {v: path for v, (_, path) in outputs.items()}, geometry)
+    finally:
+        for _, tmp_output in outputs.values():
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+
+def render_streaming(task_id, input_url, base_output_key, captions, failed_state="FAILED", media=None):
+    """
+    presigned URL에서 바로 디코드하고, variant별 출력 파이프를 S3 업로드 스레드가
+    동시에 읽어 올립니다. 임시 파일을 쓰지 않습니다.
+    """
+    if not captions:
+        return
+    pipes = {variant: os.pipe() for variant in captions}
+    keys = {variant: f"{base_output_key}_{variant}.mp4" for variant in captions}
+    outputs = {variant: (text, f"pipe:{pipes[variant][1]}") for variant, text in captions.items()}
+
+    print(f"🎬 Rendering {list(outputs)} with streaming I/O...")
+    publish_all_variants(task_id, outputs, "RENDERING")
+    render_started = time.monotonic()
+    render_error = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(pipes)) as uploader:
+        uploads = {
+            variant: uploader.submit(upload_stream, keys[variant], read_fd)
+            for variant, (read_fd, _) in pipes.items()
+        }
+        try:
+            geometry = render.render_variants(
+                input_url, outputs, pass_fds=[w for _, w in pipes.values()], media=media,
+            )
+        except Exception as e:
+            render_error = e
+        finally:
+            # 부모 쪽 쓰기 끝을 닫아야 업로드 스레드가 EOF를 받음
+            for _, write_fd in pipes.values():
+                os.close(write_fd)
+        render_ms = _elapsed_ms(render_started)
+        flush_started = time.monotonic()
+        concurrent.futures.wait(uploads.values())
+
+    if render_error is not None:
+        print(f"❌ Streaming render failed: {render_error}")
+        # EOF로 완료된 업로드는 잘린 파일이므로 삭제
+        for variant, future in uploads.items():
+            if future.exception() is None:
+                try:
+                    s3_client.delete_object(Bucket=AWS_S3_BUCKET, Key=keys[variant])
+                except ClientError as e:
+                    print(f"⚠️  Failed to delete partial upload {keys[variant]}: {e}")
+        publish_all_variants(task_id, outputs, failed_state, error=str(render_error)[:300])
+        raise render_error
+
+    failed = []
+    for variant, future in uploads.items():
+        if future.exception() is not None:
+            print(f"❌ Error uploading {variant}: {future.exception()}")
+            publish_variant_state(task_id, variant, failed_state, error=str(future.exception())[:300])
+            failed.append(variant)
+            continue
+        print(f"✅ {variant} 업로드 완료: {keys[variant]}")
+        # upload_ms: 인코딩 종료 후 마지막 part 업로드까지 걸린 시간
+        publish_variant_state(
+            task_id, variant, "READY",
+            render_ms=render_ms, upload_ms=_elapsed_ms(flush_started), ready_at=time.time(),
+        )
+    if failed:
+        raise RuntimeError(f"Upload failed for {failed}")
+
+    if HLS_ENABLED:
+        # 업로드된 결과물을 presigned URL로 다시 읽어 패키징
+        publish_hls(task_id, base_output_key, {v: presigned_input_url(k) for v, k in keys.items()}, geometry)
+
+def render_each_variant(task_id, tmp_input, base_output_key, captions, failed_state="FAILED"):
+    """variant마다 run_ffmpeg_shorts.sh를 따로 실행합니다. (기존 방식)"""
+    failed = []
+    for variant, text in captions.items():
+        print(f"🎬 Processing [{variant}] video with FFmpeg... Text: '{text}'")
+        tmp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+
+        # 각각의 S3 저장 경로 생성 (예: user_id/task_id_v1.mp4)
+        variant_output_key = f"{base_output_key}_{variant}.mp4"
+
+        try:
+            publish_variant_state(task_id, variant, "RENDERING")
+            render_started = time.monotonic()
+            # FFmpeg 실행
+            subprocess.run(
+                [
+                    FFMPEG_SCRIPT,
+                    tmp_input,
+                    tmp_output,
+                    "", # TTS Wav (없음)
+                    "", # Subtitle (없음)
+                    text, # 생성된 텍스트 자막
+                ],
+                check=True,
+            )
+
+            # S3 업로드
+            publish_variant_state(task_id, variant, "UPLOADING", render_ms=_elapsed_ms(render_started))
+            upload_started = time.monotonic()
+            upload_object(variant_output_key, tmp_output)
+            print(f"✅ {variant} 업로드 완료: {variant_output_key}")
+            publish_variant_state(
+                task_id, variant, "READY",
+                upload_ms=_elapsed_ms(upload_started), ready_at=time.time(),
+            )
+
+        except Exception as e:
+            print(f"❌ Error processing {variant}: {e}")
+            publish_variant_state(task_id, variant, failed_state, error=str(e)[:300])
+            failed.append(variant)
+        finally:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+
+    if failed:
+        raise RuntimeError(f"Render failed for {failed}")
+
+def job_media(job: dict, source: str):
+    """job에 probe 결과가 없으면(이전 버전 WAS) 직접 ffprobe. 실패하면 None (기본 1080x1920)."""
+    if job.get("probe"):
+        return job["probe"]
+    try:
+        return render.probe(source)
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"⚠️  ffprobe failed, using default render plan: {e}")
+        return None
+
+def process_job(job: dict):
+    input_key = job["input_key"]
+    task_id = job_task_id(job)
+    # _processed.mp4를 잘라내어 베이스 키 생성 (예: user_id/task_id)
+    base_output_key = job["output_key"].replace("_processed.mp4", "")
+
+    # 스트리밍 모드는 multi 렌더링에서만 사용 (스크립트 방식은 로컬 파일 필요)
+    streaming = STREAM_IO and RENDER_MODE == "multi"
+    tmp_input = None
+
+    # 재시도/회수된 작업: 이전 시도에서 이미 READY가 된 variant는 다시 만들지 않음
+    # (READY → RENDERING으로 상태가 되돌아가 보이지 않도록)
+    try:
+        done = {v for v, status in variant_states(task_id).items() if status == "READY"}
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Could not read variant states for {task_id}, rendering all: {e}")
+        done = set()
+    pending = [v for v in VARIANTS if v not in done]
+    if not pending:
+        print(f"⏭️  All variants of {task_id} are already READY. Skipping.")
+        return
+    if done:
+        print(f"⏭️  Already READY: {sorted(done)}, rendering {pending}")
+
+    try:
+        # 1. S3 다운로드 (스트리밍 모드면 presigned URL만 발급)
+        if streaming:
+            source = presigned_input_url(input_key)
+        else:
+            tmp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+            download_object(input_key, tmp_input)
+            source = tmp_input
+
+        # ffprobe 결과: WAS가 ingest 시 job에 넣어둔 값을 우선 사용 (재시도 때도 재사용)
+        media = job_media(job, source) if RENDER_MODE == "multi" else None
+
+        # 2. 캡션 생성 (in-process, Ollama 세션 재사용)
+        publish_all_variants(task_id, pending, "CAPTIONING")
+        caption_started = time.monotonic()
+        print(f"🧠 Generating captions (v1 & v2) via Ollama {ollama_pool.stats()}...")
+        cache = (
+            CaptionCache(redis_client, generate_caption.MODEL, generate_caption.PROMPTS)
+            if CAPTION_CACHE_ENABLED else None
+        )
+        captions = generate_caption.generate_captions(source, cache=cache, pool=ollama_pool)
+        if cache is not None:
+            try:
+                print(f"🗃️  Caption cache: {cache_stats(redis_client)}")
+            except redis.exceptions.RedisError:
+                pass
+
+        print(f"📝 Extracted Captions: {captions} ({_elapsed_ms(caption_started)}ms)")
+        captions = {v: text for v, text in captions.items() if v not in done}
+
+        # 3. v1, v2 영상 렌더링 및 업로드
+        # 재시도가 남아 있으면 클라이언트가 포기하지 않도록 RETRYING으로 표시
+        failed_state = "FAILED" if job.get("attempt", 1) >= MAX_ATTEMPTS else "RETRYING"
+        if streaming:
+            render_streaming(task_id, source, base_output_key, captions, failed_state, media)
+        elif RENDER_MODE == "multi":
+            render_all_variants(task_id, tmp_input, base_output_key, captions, failed_state, media)
+        else:
+            render_each_variant(task_id, tmp_input, base_output_key, captions, failed_state)
 
         print("🎉 모든 버전(v1, v2) 작업이 완료되었습니다.")
 
     except Exception as e:
         print(f"❌ Error processing job: {e}")
+        # supervisor가 재시도 / dead-letter 여부를 결정하도록 예외 전달
+        raise
     finally:
-        if os.path.exists(tmp_input):
+        if tmp_input and os.path.exists(tmp_input):
             os.remove(tmp_input)
 
+# ---------------------------------------------------------
+# 동시성 계산 (컨테이너 cgroup 제한 반영)
+# ---------------------------------------------------------
+def _cgroup_cpu_limit():
+    """cgroup v2 cpu.max / v1 cfs quota 에서 CPU 개수를 읽습니다. 제한이 없으면 None."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+            if quota != "max":
+                return max(1, int(int(quota) / int(period)))
+            return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _memory_limit_mb():
+    """cgroup 메모리 제한(없으면 물리 메모리)을 MB로 반환합니다."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+            if raw != "max" and int(raw) < (1 << 60):
+                return int(raw) // (1024 * 1024)
+        except (OSError, ValueError):
+            continue
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError):
+        return None
+
+def available_cpus() -> int:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    cgroup_cpus = _cgroup_cpu_limit()
+    if cgroup_cpus:
+        cpus = min(cpus, cgroup_cpus)
+    return cpus
+
+def detect_concurrency() -> int:
+    n = available_cpus()
+    mem_mb = _memory_limit_mb()
+    if mem_mb:
+        n = min(n, max(1, mem_mb // JOB_MEMORY_MB))
+    if WORKER_CONCURRENCY > 0:
+        n = min(n, WORKER_CONCURRENCY)
+    return max(1, n)
+
+# ---------------------------------------------------------
+# 자식 프로세스 초기화 / 실행
+# ---------------------------------------------------------
+def _init_child():
+    """fork 이후 커넥션을 공유하지 않도록 자식마다 클라이언트를 새로 만듭니다."""
+    global redis_client, s3_client, ec2_client, ollama_pool
+    # 종료 신호는 supervisor가 처리 (자식은 진행 중인 작업을 끝까지 수행)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    s3_client = boto3.client('s3', region_name=AWS_REGION)
+    ec2_client = boto3.client('ec2', region_name=AWS_REGION)
+    # 헬스 체크 스레드는 fork로 넘어오지 않으므로 자식마다 풀을 새로 구성
+    # (EC2 탐색은 하지 않고 supervisor가 게시한 목록을 사용)
+    ollama_pool = build_child_ollama_pool().start()
+
+def _run_job(job: dict):
+    print(f"📥 [pid {os.getpid()}] Received job: {job}")
+    process_job(job)
+
+# ---------------------------------------------------------
+# Supervisor: 큐에서 꺼내 프로세스 풀에 분배
+# ---------------------------------------------------------
+_shutdown = False
+
+def _request_shutdown(signum, frame):
+    global _shutdown
+    if not _shutdown:
+        print(f"🛑 Signal {signum} received. Finishing in-flight jobs...")
+    _shutdown = True
+
+def _settle(queue, in_flight: dict, done) -> bool:
+    """
+    끝난 작업을 ack / 재시도 처리합니다.
+    자식 프로세스가 비정상 종료(OOM 등)되어 풀이 깨졌으면 True를 반환합니다.
+    """
+    broken = False
+    for future in done:
+        msg_id, fields = in_flight.pop(future)
+        exc = future.exception()
+        try:
+            if exc is None:
+                queue.ack(msg_id)
+            else:
+                if isinstance(exc, concurrent.futures.process.BrokenProcessPool):
+                    broken = True
+                print(f"❌ Job {msg_id} failed: {exc}")
+                queue.fail(msg_id, fields, str(exc) or exc.__class__.__name__)
+        except redis.exceptions.RedisError as e:
+            # ack 실패 시 메시지는 pending으로 남고 visibility timeout 후 다시 처리됨
+            print(f"⚠️ Could not settle job {msg_id}: {e}")
+    return broken
+
+def _new_pool(concurrency):
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=concurrency,
+        initializer=_init_child,
+    )
+
+def _restart_pool(pool, queue, in_flight: dict, concurrency):
+    """깨진 풀의 남은 작업을 재시도 처리하고 새 풀을 반환합니다."""
+    for future in list(in_flight):
+        future.cancel()
+    concurrent.futures.wait(in_flight)
+    _settle(queue, in_flight, set(in_flight))
+    pool.shutdown(wait=False)
+    return _new_pool(concurrency)
+
+def _submit(pool, queue, in_flight: dict, concurrency, job: dict, fn=None):
+    """
+    작업을 풀에 제출하고 (pool, future)를 반환합니다.
+    유휴 중에 자식이 죽어(OOM 등) 풀이 이미 깨져 있으면 submit이 바로
+    BrokenProcessPool을 던지므로, 풀을 새로 만들어 한 번 더 제출합니다.
+    """
+    fn = fn or _run_job
+    try:
+        return pool, pool.submit(fn, job)
+    except concurrent.futures.process.BrokenProcessPool:
+        print("⚠️ Process pool is broken. Restarting before submit...")
+        pool = _restart_pool(pool, queue, in_flight, concurrency)
+        return pool, pool.submit(fn, job)
+
 def main():
-    print(f"🚀 AI Worker started (Target Ollama: {CURRENT_OLLAMA_HOST})")
-    
-    while True:
+    concurrency = detect_concurrency()
+    # 동시 작업마다 ffmpeg가 코어 수만큼 스레드를 띄우지 않도록 CPU를 나눠 줌
+    # (fork된 자식은 render 모듈 값을, spawn된 자식은 환경변수를 읽음)
+    if render.FFMPEG_THREADS <= 0:
+        render.FFMPEG_THREADS = max(1, available_cpus() // concurrency)
+        os.environ["FFMPEG_THREADS"] = str(render.FFMPEG_THREADS)
+    print(f"🚀 AI Worker started (Ollama backends: {ollama_pool.hosts()}, concurrency={concurrency}, ffmpeg threads={render.FFMPEG_THREADS})")
+
+    signal.signal(signal.SIGTERM, _request_shutdown)
+    signal.signal(signal.SIGINT, _request_shutdown)
+
+    queue = JobQueue(redis_client, on_dead=mark_job_dead)
+    in_flight = {}  # future -> (msg_id, fields)
+    hosts_synced_at = None
+    pool = _new_pool(concurrency)
+
+    while not _shutdown:
         try:
-            # Redis 큐 대기
-            result = redis_client.brpop(REDIS_QUEUE, timeout=5)
-            if result:
-                _, raw = result
-                # 데이터 파싱 (bytes 대응)
-                if isinstance(raw, bytes):
-                    raw = raw.decode('utf-8')
-                    
-                job = json.loads(raw)
-                print(f"📥 Received job: {job}")
-                process_job(job)
-                
+            queue.ensure_group()
+            queue.migrate_legacy()
+            queue.promote_delayed()
+            queue.touch(msg_id for msg_id, _ in in_flight.values())
+            if hosts_synced_at is None:
+                publish_hosts(redis_client, ollama_pool.hosts())
+                hosts_synced_at = time.monotonic()
+            elif time.monotonic() - hosts_synced_at >= OLLAMA_DISCOVERY_INTERVAL_SECONDS:
+                hosts_synced_at = time.monotonic()
+                sync_ollama_hosts()
+
+            free = concurrency - len(in_flight)
+            if free <= 0:
+                # 빈 자리가 없으면 작업 하나가 끝날 때까지 대기
+                done, _ = concurrent.futures.wait(
+                    in_flight, timeout=5, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+            else:
+                # 죽은 워커가 남긴 작업을 먼저 회수, 없으면 새 작업 대기
+                messages = queue.reclaim(free) or queue.read(free, block_ms=5000)
+                for msg_id, fields in messages:
+                    try:
+                        job = json.loads(fields["job"])
+                    except (KeyError, json.JSONDecodeError) as e:
+                        queue.dead_letter(msg_id, fields, f"invalid job payload: {e}")
+                        continue
+                    job["attempt"] = int(fields.get("attempt", 1))
+                    pool, future = _submit(pool, queue, in_flight, concurrency, job)
+                    in_flight[future] = (msg_id, fields)
+                done = {f for f in in_flight if f.done()}
+
+            if _settle(queue, in_flight, done):
+                print("⚠️ Worker process died. Restarting process pool...")
+                pool = _restart_pool(pool, queue, in_flight, concurrency)
+
         except redis.exceptions.ConnectionError:
             print("⚠️ Redis connection lost. Retrying in 5s...")
             time.sleep(5)
@@ -190,5 +723,20 @@ def main():
             print(f"❌ Unexpected error: {e}")
             time.sleep(1)
 
+    print(f"⏳ Waiting for {len(in_flight)} in-flight job(s)...")
+    while in_flight:
+        # 마무리하는 동안에도 visibility timeout이 지나 다른 replica가 회수하지 않도록 touch
+        try:
+            queue.touch(msg_id for msg_id, _ in in_flight.values())
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Could not touch in-flight jobs: {e}")
+        done, _ = concurrent.futures.wait(in_flight, timeout=5)
+        _settle(queue, in_flight, done)
+    pool.shutdown()
+    print("👋 AI Worker stopped.")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "dlq":
+        dlq_cli(redis_client, sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# worker 모듈은 src/ 에서 바로 import (컨테이너의 /opt/ai 와 같은 구조)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,86 @@
+from ollama_pool import OllamaPool, inflight_key, owner_key
+
+
+class FakeRedis:
+    """테스트에 필요한 명령만 흉내 내는 Redis (TTL 만료는 expire_now로 재현)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = str(value)
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    def hdel(self, key, field):
+        self.data.get(key, {}).pop(field, None)
+
+    def expire_now(self, key):
+        self.data.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+
+HOSTS = ["http://a:11434", "http://b:11434"]
+
+
+def test_in_flight_counts_are_shared_between_processes():
+    client = FakeRedis()
+    first = OllamaPool(HOSTS, redis_client=client)
+    second = OllamaPool(HOSTS, redis_client=client)
+
+    with first.acquire() as host:
+        # 다른 프로세스의 풀도 진행 중인 요청을 보고 나머지 호스트를 고름
+        with second.acquire() as other:
+            assert other != host
+
+    assert second._load(list(second.backends.values())) == {h: 0 for h in HOSTS}
+
+
+def test_leaked_increment_is_dropped_after_owner_expires():
+    client = FakeRedis()
+    crashed = OllamaPool(HOSTS, redis_client=client)
+    # DECR 없이 죽은 프로세스가 남긴 요청 수
+    crashed._add(crashed.backends[HOSTS[0]], 1)
+    crashed._add(crashed.backends[HOSTS[0]], 1)
+
+    survivor = OllamaPool(HOSTS, redis_client=client)
+    backends = list(survivor.backends.values())
+    assert survivor._load(backends)[HOSTS[0]] == 2
+
+    # heartbeat가 끊겨 owner 키가 만료되면 그 몫은 무시되고 정리됨
+    client.expire_now(owner_key(crashed.owner))
+    assert survivor._load(backends)[HOSTS[0]] == 0
+    assert crashed.owner not in client.hgetall(inflight_key(HOSTS[0]))
+
+    # 트래픽이 계속 있어도 다시 살아나지 않음
+    with survivor.acquire() as host:
+        assert survivor._load(backends)[host] == 1
+    assert survivor._load(backends) == {h: 0 for h in HOSTS}
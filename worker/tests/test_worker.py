@@ -0,0 +1,41 @@
+import os
+import concurrent.futures
+
+import pytest
+
+# import 시 EC2 탐색을 하지 않도록
+os.environ["OLLAMA_DISCOVERY_TAG"] = ""
+
+import worker  # noqa: E402
+
+
+def _crash(_job):
+    os._exit(1)
+
+
+def _echo(job):
+    return job["task_id"]
+
+
+@pytest.fixture
+def plain_pool(monkeypatch):
+    # 자식 초기화(Redis/S3/Ollama 연결) 없이 같은 ProcessPoolExecutor 사용
+    monkeypatch.setattr(worker, "_new_pool", lambda n: concurrent.futures.ProcessPoolExecutor(max_workers=n))
+
+
+def test_submit_rebuilds_pool_broken_while_idle(plain_pool):
+    pool = worker._new_pool(1)
+    # 유휴 중 자식이 죽은 상황 재현 → 이후 submit은 즉시 BrokenProcessPool
+    crashed = pool.submit(_crash, {})
+    with pytest.raises(concurrent.futures.process.BrokenProcessPool):
+        crashed.result()
+    with pytest.raises(concurrent.futures.process.BrokenProcessPool):
+        pool.submit(_echo, {"task_id": "t0"})
+
+    new_pool, future = worker._submit(pool, queue=None, in_flight={}, concurrency=1,
+                                      job={"task_id": "t1"}, fn=_echo)
+    try:
+        assert new_pool is not pool
+        assert future.result(timeout=30) == "t1"
+    finally:
+        new_pool.shutdown()